@@ -0,0 +1,254 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Fragmentos de URL que identifican las respuestas de la API de búsqueda
+SEARCH_API_PATTERNS = [
+    p.strip()
+    for p in os.getenv("SEARCH_API_PATTERNS", "/api/,search,listings").split(",")
+    if p.strip()
+]
+SEARCH_API_TIMEOUT = float(os.getenv("SEARCH_API_TIMEOUT", "15"))
+# Margen para que llegue el JSON cuando el contenedor de resultados ya se ve
+SEARCH_API_GRACE = float(os.getenv("SEARCH_API_GRACE", "1"))
+
+# Claves candidatas en el JSON de la API para cada campo del registro
+LISTING_FIELD_KEYS = {
+    "id": ["id", "listingId", "propertyId", "displayId"],
+    "price": ["price", "priceFormatted", "formattedPrice", "price.formatted"],
+    "currency": ["currency", "price.currency", "priceCurrency"],
+    "location": ["location", "address", "city", "location.name", "address.city"],
+    "headline": ["headline", "title", "name"],
+    "bedrooms": ["bedrooms", "bedroomsCount", "numberOfBedrooms"],
+    "bathrooms": ["bathrooms", "bathroomsCount", "numberOfBathrooms"],
+    "url": ["url", "link", "href", "detailUrl", "path"],
+    "latitude": ["latitude", "lat", "coordinates.latitude", "geo.lat", "location.lat"],
+    "longitude": [
+        "longitude",
+        "lng",
+        "lon",
+        "coordinates.longitude",
+        "geo.lng",
+        "location.lng",
+    ],
+    "living_surface": ["livingSurface", "livingArea", "surface.living"],
+    "plot_surface": ["plotSurface", "plotArea", "surface.plot"],
+    "total_surface": ["totalSurface", "totalArea", "surface.total"],
+}
+TOTAL_KEYS = ["total", "totalCount", "totalResults", "totalHits", "count"]
+# Datos del router (Next.js) que solo repiten la URL pedida, no lo aplicado
+ROUTER_KEYS = ("query", "asPath", "params")
+
+
+def _get(item: Dict[str, Any], path: str) -> Any:
+    value: Any = item
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _first(item: Dict[str, Any], keys: List[str]) -> Any:
+    for key in keys:
+        value = _get(item, key)
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def _format_price(price: Any, currency: Any) -> Optional[str]:
+    if isinstance(price, dict):
+        currency = currency or price.get("currency")
+        price = price.get("formatted") or price.get("amount") or price.get("value")
+    if isinstance(price, (int, float)):
+        price = f"{int(price):,}".replace(",", ".")
+    if price is None:
+        return None
+    price = str(price)
+    if currency and not price.startswith(str(currency)):
+        price = f"{currency} {price}"
+    return price
+
+
+def _looks_like_listing(item: Any) -> bool:
+    return (
+        isinstance(item, dict)
+        and _first(item, LISTING_FIELD_KEYS["price"]) is not None
+        and (
+            _first(item, LISTING_FIELD_KEYS["id"]) is not None
+            or _first(item, LISTING_FIELD_KEYS["url"]) is not None
+        )
+    )
+
+
+def find_listings(payload: Any) -> List[Dict[str, Any]]:
+    """Busca recursivamente la lista de anuncios más grande dentro del payload"""
+    best: List[Dict[str, Any]] = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            listings = [item for item in node if _looks_like_listing(item)]
+            if len(listings) > len(best):
+                best = listings
+            stack.extend(item for item in node if isinstance(item, (dict, list)))
+        elif isinstance(node, dict):
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+    return best
+
+
+def find_total(payload: Any) -> Optional[int]:
+    """
+    Devuelve el total de resultados si el payload lo incluye en el primer
+    nivel o, en datos anidados (hidratación), junto a la lista de anuncios
+    """
+    if not isinstance(payload, dict):
+        return None
+    for container in (payload, payload.get("meta"), payload.get("pagination")):
+        if isinstance(container, dict):
+            value = _first(container, TOTAL_KEYS)
+            if isinstance(value, int):
+                return value
+
+    # Recorrido por niveles: gana el objeto con anuncios más cercano a la raíz
+    queue = deque([payload])
+    while queue:
+        node = queue.popleft()
+        if isinstance(node, list):
+            queue.extend(item for item in node if isinstance(item, (dict, list)))
+        elif isinstance(node, dict):
+            has_listings = any(
+                isinstance(v, list) and any(_looks_like_listing(i) for i in v)
+                for v in node.values()
+            )
+            value = _first(node, TOTAL_KEYS) if has_listings else None
+            if isinstance(value, int):
+                return value
+            queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+    return None
+
+
+def find_filter_state(payload: Any, params: Iterable[str]) -> Dict[str, Any]:
+    """
+    Valores que el payload declara para los parámetros de filtro `params`,
+    ignorando los datos del router, que repiten la URL aunque el sitio no
+    haya aplicado el filtro.
+    """
+    params = set(params)
+    state: Dict[str, Any] = {}
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(item for item in node if isinstance(item, (dict, list)))
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in ROUTER_KEYS:
+                    continue
+                if key in params and isinstance(value, (str, int, float)):
+                    state.setdefault(key, value)
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+    return state
+
+
+def is_search_api_response(response, patterns: Optional[List[str]] = None) -> bool:
+    """Indica si la respuesta es un JSON de la API de búsqueda (xhr/fetch)"""
+    if response.request.resource_type not in ("xhr", "fetch"):
+        return False
+    if "json" not in response.headers.get("content-type", ""):
+        return False
+    return any(pattern in response.url for pattern in patterns or SEARCH_API_PATTERNS)
+
+
+def parse_api_listing(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte un anuncio de la API al mismo formato que las cards del DOM"""
+    property_data = {
+        field: _first(item, keys)
+        for field, keys in LISTING_FIELD_KEYS.items()
+        if field not in ("price", "currency")
+    }
+    property_data["price"] = _format_price(
+        _first(item, LISTING_FIELD_KEYS["price"]),
+        _first(item, LISTING_FIELD_KEYS["currency"]),
+    )
+    if isinstance(property_data.get("location"), dict):
+        property_data["location"] = _first(
+            property_data["location"], ["name", "city", "label"]
+        )
+    for field in ("id", "bedrooms", "bathrooms"):
+        if property_data.get(field) is not None:
+            property_data[field] = str(property_data[field])
+    return property_data
+
+
+class SearchApiCapture:
+    """
+    Escucha las respuestas JSON de la API de búsqueda de una página y guarda
+    los anuncios del último payload recibido.
+    """
+
+    def __init__(self, patterns: Optional[List[str]] = None):
+        self.patterns = patterns or SEARCH_API_PATTERNS
+        self.listings: List[Dict[str, Any]] = []
+        self.total: Optional[int] = None
+        # Último payload con anuncios, para leer el estado de los filtros
+        self.payload: Any = None
+        # La página actual no trajo la API a tiempo; no se vuelve a esperar
+        self.timed_out = False
+        self._received = asyncio.Event()
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def reset(self):
+        """Olvida el último payload; llamar antes de cada navegación o envío"""
+        self.listings = []
+        self.total = None
+        self.payload = None
+        self.timed_out = False
+        self._received.clear()
+
+    async def _on_response(self, response):
+        if not is_search_api_response(response, self.patterns):
+            return
+        try:
+            payload = await response.json()
+        except Exception as e:
+            logger.debug(f"Respuesta de la API no legible ({response.url}): {str(e)}")
+            return
+
+        listings = find_listings(payload)
+        if not listings:
+            return
+
+        self.listings = [parse_api_listing(item) for item in listings]
+        self.payload = payload
+        self.total = find_total(payload) or self.total
+        self._received.set()
+        logger.info(f"{len(listings)} anuncios capturados de la API: {response.url}")
+
+    async def wait_for_listings(
+        self, timeout: float = SEARCH_API_TIMEOUT
+    ) -> List[Dict[str, Any]]:
+        """
+        Espera el primer payload con anuncios; devuelve [] si no llega a
+        tiempo. Tras un timeout no se vuelve a esperar hasta el próximo reset.
+        """
+        if self.timed_out and not self._received.is_set():
+            return self.listings
+        try:
+            await asyncio.wait_for(self._received.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            logger.info("No se capturaron anuncios de la API a tiempo")
+        return self.listings
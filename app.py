@@ -1,9 +1,75 @@
-from fastapi import FastAPI, HTTPException
+import os
+import json
+import asyncio
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Literal
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
 from pydantic import BaseModel
 import uvicorn
-from scraper import run_scraper
+from browser_pool import BrowserPool
+from deadline import DeadlineExceeded
+from http_fetcher import close_client
+from interceptor import asset_cache
+from job_queue import JobQueue, QueueFullError
+from listing_export import FILE_EXTENSIONS, MEDIA_TYPES, iter_export
+from listing_record import parse_listings
+from listing_store import ListingStore
+from location_cache import location_cache
+from result_cache import ResultCache, cache_key
+from scraper import iter_scraper, run_scraper
+from selector_registry import selector_registry
+from supervisor import WORKER_PROCESSES, WorkerSupervisor
 
-app = FastAPI(title="Real Estate Scraper API")
+browser_pool = BrowserPool()
+result_cache = ResultCache()
+listing_store = ListingStore()
+# Con WORKER_PROCESSES > 0 los scrapes corren en procesos worker y el pool
+# local no se inicia
+supervisor = WorkerSupervisor() if WORKER_PROCESSES > 0 else None
+
+# Campos que solo afectan el rendimiento y no el resultado. El presupuesto
+# de tiempo queda en la clave: una petición sin límite no debe esperar un
+# scrape con presupuesto que puede terminar en un resultado parcial
+CACHE_KEY_EXCLUDE = {
+    "page_concurrency",
+    "detail_concurrency",
+    "pacing",
+    "fetch_mode",
+}
+
+# Cada cuánto se revisa si el cliente HTTP sigue conectado
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El pool de navegadores (o los workers) vive lo mismo que la aplicación
+    if supervisor is not None:
+        await supervisor.start()
+    else:
+        await browser_pool.start()
+    await job_queue.start()
+    try:
+        yield
+    finally:
+        await job_queue.close()
+        if supervisor is not None:
+            await supervisor.close()
+        else:
+            await browser_pool.close()
+        await close_client()
+        listing_store.close()
+        location_cache.close()
+
+
+app = FastAPI(title="Real Estate Scraper API", lifespan=lifespan)
 
 
 class ScrapingRequest(BaseModel):
@@ -26,32 +92,380 @@ class ScrapingRequest(BaseModel):
     bathrooms_max: str | None = None
     construction_year_min: str | None = None
     construction_year_max: str | None = None
+    extraction_mode: str = "api"
+    page_concurrency: int | None = None
+    max_pages: int | None = None
+    max_results: int | None = None
+    navigation_mode: str = "url"
+    enrich: bool = False
+    detail_concurrency: int | None = None
+    delta: bool = False
+    pacing: Literal["fast", "default", "stealth"] = "default"
+    # Presupuesto de tiempo en segundos; también vía la cabecera X-Time-Budget
+    time_budget: float | None = None
+    # Dividir búsquedas con más resultados de los que el sitio pagina
+    split: bool = False
+    # "http" lee los resultados sin navegador cuando el sitio lo permite
+    fetch_mode: Literal["http", "browser"] = "http"
+    # Grabar la sesión en un HAR o reproducirla sin red (ver har_replay)
+    har_mode: Literal["live", "record", "replay"] = "live"
+    har_name: str | None = None
+    # Latencia fija simulada por respuesta al reproducir (ms)
+    har_latency: float | None = None
 
 
-@app.post("/scrape")
-async def scrape_properties(request: ScrapingRequest):
+class BatchScrapingRequest(BaseModel):
+    requests: List[ScrapingRequest]
+    concurrency: int | None = None
+
+
+class JobRequest(ScrapingRequest):
+    priority: Literal["low", "normal", "high"] = "normal"
+
+
+async def run_job(params: Dict[str, Any]) -> List[Dict[str, Any]]:
     try:
-        results = await run_scraper(
-            location=request.location,
-            property_type=request.property_type,
-            property_subtype=request.property_subtype,
-            price_min=request.price_min,
-            price_max=request.price_max,
-            living_surface_min=request.living_surface_min,
-            living_surface_max=request.living_surface_max,
-            plot_surface_min=request.plot_surface_min,
-            plot_surface_max=request.plot_surface_max,
-            total_surface_min=request.total_surface_min,
-            total_surface_max=request.total_surface_max,
-            rooms_min=request.rooms_min,
-            rooms_max=request.rooms_max,
-            bedrooms_min=request.bedrooms_min,
-            bedrooms_max=request.bedrooms_max,
-            bathrooms_min=request.bathrooms_min,
-            bathrooms_max=request.bathrooms_max,
-            construction_year_min=request.construction_year_min,
-            construction_year_max=request.construction_year_max,
+        return await scrape(ScrapingRequest(**params))
+    except DeadlineExceeded as e:
+        return e.partial
+
+
+job_queue = JobQueue(runner=run_job)
+
+
+def scraper_kwargs(request: ScrapingRequest) -> Dict[str, Any]:
+    """
+    Parámetros de run_scraper / iter_scraper para una petición, sin el pool
+    ni el almacén para que se puedan enviar a un proceso worker
+    """
+    return dict(
+        location=request.location,
+        property_type=request.property_type,
+        property_subtype=request.property_subtype,
+        price_min=request.price_min,
+        price_max=request.price_max,
+        living_surface_min=request.living_surface_min,
+        living_surface_max=request.living_surface_max,
+        plot_surface_min=request.plot_surface_min,
+        plot_surface_max=request.plot_surface_max,
+        total_surface_min=request.total_surface_min,
+        total_surface_max=request.total_surface_max,
+        rooms_min=request.rooms_min,
+        rooms_max=request.rooms_max,
+        bedrooms_min=request.bedrooms_min,
+        bedrooms_max=request.bedrooms_max,
+        bathrooms_min=request.bathrooms_min,
+        bathrooms_max=request.bathrooms_max,
+        construction_year_min=request.construction_year_min,
+        construction_year_max=request.construction_year_max,
+        extraction_mode=request.extraction_mode,
+        page_concurrency=request.page_concurrency,
+        max_pages=request.max_pages,
+        max_results=request.max_results,
+        navigation_mode=request.navigation_mode,
+        enrich=request.enrich,
+        detail_concurrency=request.detail_concurrency,
+        delta=request.delta,
+        pacing=request.pacing,
+        time_budget=request.time_budget,
+        split=request.split,
+        fetch_mode=request.fetch_mode,
+        har_mode=request.har_mode,
+        har_name=request.har_name,
+        har_latency=request.har_latency,
+    )
+
+
+def iter_request(
+    request: ScrapingRequest, context=None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Propiedades de la petición, desde un proceso worker o el pool local"""
+    if supervisor is not None and context is None:
+        return supervisor.iter_results(scraper_kwargs(request))
+    return iter_scraper(
+        **scraper_kwargs(request),
+        pool=browser_pool,
+        store=listing_store if request.delta else None,
+        context=context,
+    )
+
+
+async def run_request(request: ScrapingRequest, context=None) -> List[Dict[str, Any]]:
+    if supervisor is not None and context is None:
+        return await supervisor.run(scraper_kwargs(request))
+    return await run_scraper(
+        **scraper_kwargs(request),
+        pool=browser_pool,
+        store=listing_store if request.delta else None,
+        context=context,
+    )
+
+
+async def scrape(request: ScrapingRequest, context=None) -> List[Dict[str, Any]]:
+    """Ejecuta un scrape pasando por la caché de resultados"""
+    if request.delta or request.har_mode != "live":
+        # El delta depende del estado del almacén y las grabaciones tienen
+        # que ejecutarse de verdad, así que no se cachean
+        return await run_request(request, context=context)
+
+    key = cache_key(request.model_dump(exclude=CACHE_KEY_EXCLUDE))
+    return await result_cache.get_or_compute(
+        key, lambda: run_request(request, context=context)
+    )
+
+
+def with_time_budget(request: ScrapingRequest, header: float | None) -> ScrapingRequest:
+    """El presupuesto del cuerpo tiene prioridad sobre el de la cabecera"""
+    if header is None or request.time_budget is not None:
+        return request
+    return request.model_copy(update={"time_budget": header})
+
+
+async def cancel_on_disconnect(http_request: Request, coro):
+    """
+    Ejecuta `coro` y la cancela si el cliente se desconecta, lo que cierra la
+    página y devuelve el contexto al pool de inmediato.
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Cliente desconectado")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def iter_batch(
+    requests: List[ScrapingRequest], concurrency: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ejecuta un lote de búsquedas sobre contextos compartidos: cada worker toma
+    un contexto del pool la primera vez que una búsqueda lo necesita y lo usa
+    para las siguientes. Los errores (incluido no conseguir contexto) quedan
+    aislados por búsqueda. Entrega cada resultado en cuanto termina.
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(requests):
+        pending.put_nowait(item)
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def drain(context=None):
+        while not pending.empty():
+            index, request = pending.get_nowait()
+            item = {"index": index, "request": request.model_dump()}
+            try:
+                # Las grabaciones y reproducciones HAR abren su propio contexto
+                shared = context if request.har_mode == "live" else None
+                data = await scrape(request, context=shared)
+                item.update(status="success", data=data)
+            except DeadlineExceeded as e:
+                item.update(status="partial", data=e.partial)
+            except Exception as e:
+                item.update(status="error", error=str(e))
+            await finished.put(item)
+
+    async def worker():
+        if supervisor is not None:
+            # Cada búsqueda va al proceso worker que le corresponde
+            await drain()
+            return
+        async with AsyncExitStack() as stack:
+            context = None
+
+            async def shared_context():
+                # Se toma del pool recién cuando una búsqueda necesita el
+                # navegador; las que salen por HTTP no lo ocupan
+                nonlocal context
+                if context is None:
+                    context = await stack.enter_async_context(browser_pool.context())
+                return context
+
+            await drain(shared_context)
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(max(1, min(concurrency, len(requests))))
+    ]
+    try:
+        for _ in range(len(requests)):
+            yield await finished.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def stream_properties(
+    request: ScrapingRequest, output_format: str
+) -> AsyncIterator[str]:
+    """Serializa cada propiedad en cuanto el scraper la entrega"""
+
+    def encode(payload: Dict[str, Any], event: str = "property") -> str:
+        data = json.dumps(payload, ensure_ascii=False)
+        if output_format == "sse":
+            return f"event: {event}\ndata: {data}\n\n"
+        return data + "\n"
+
+    # Si ya está en caché no hace falta abrir un navegador
+    cached = None
+    if not request.delta:
+        cached = result_cache.get(
+            cache_key(request.model_dump(exclude=CACHE_KEY_EXCLUDE))
         )
-        return {"status": "success", "data": results}
+    try:
+        if cached is not None:
+            for property_data in cached:
+                yield encode(property_data)
+        else:
+            async with aclosing(iter_request(request)) as properties:
+                async for property_data in properties:
+                    yield encode(property_data)
+    except DeadlineExceeded as e:
+        yield encode({"error": str(e), "partial": True}, event="deadline")
+        return
+    except Exception as e:
+        yield encode({"error": str(e)}, event="error")
+        return
+
+    if output_format == "sse":
+        yield encode({}, event="end")
+
+
+def export_response(results: List[Dict[str, Any]], format: str, status: str):
+    """Respuesta columnar (Arrow IPC, Parquet o CSV) con los anuncios tipados"""
+    records = parse_listings(results)
+    return StreamingResponse(
+        iter_export(records, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="listings.{FILE_EXTENSIONS[format]}"'
+            ),
+            "X-Scrape-Status": status,
+        },
+    )
+
+
+@app.post("/scrape")
+async def scrape_properties(
+    request: ScrapingRequest,
+    http_request: Request,
+    format: Literal["json", "arrow", "parquet", "csv"] = "json",
+    x_time_budget: float | None = Header(None),
+):
+    request = with_time_budget(request, x_time_budget)
+    try:
+        results = await cancel_on_disconnect(http_request, scrape(request))
+        status = "success"
+    except DeadlineExceeded as e:
+        results, status = e.partial, "partial"
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    if format != "json":
+        return export_response(results, format, status)
+    return {"status": status, "data": results}
+
+
+@app.post("/scrape/stream")
+async def scrape_properties_stream(
+    request: ScrapingRequest,
+    format: Literal["ndjson", "sse"] = "ndjson",
+    x_time_budget: float | None = Header(None),
+):
+    # StreamingResponse cancela el generador si el cliente se desconecta
+    request = with_time_budget(request, x_time_budget)
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream_properties(request, format), media_type=media_type)
+
+
+@app.post("/scrape/batch")
+async def scrape_properties_batch(request: BatchScrapingRequest, stream: bool = False):
+    concurrency = request.concurrency or (
+        supervisor.workers * browser_pool.max_concurrency
+        if supervisor is not None
+        else browser_pool.max_concurrency
+    )
+    if stream:
+
+        async def lines():
+            async with aclosing(iter_batch(request.requests, concurrency)) as items:
+                async for item in items:
+                    yield json.dumps(item, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    items = [None] * len(request.requests)
+    async with aclosing(iter_batch(request.requests, concurrency)) as finished:
+        async for item in finished:
+            items[item["index"]] = item
+    return {"status": "success", "data": items}
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    try:
+        job_id = await job_queue.submit(
+            request.model_dump(exclude={"priority"}), priority=request.priority
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+
+@app.get("/listings")
+async def get_listing(url: str):
+    listing = listing_store.get(url)
+    if listing is None:
+        raise HTTPException(status_code=404, detail="Anuncio no encontrado")
+    return listing
+
+
+@app.get("/metrics")
+async def metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Agregar las métricas de todos los procesos worker
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/selectors")
+async def selector_winners():
+    return selector_registry.winners()
+
+
+@app.get("/workers")
+async def worker_stats():
+    if supervisor is None:
+        # Sin workers, el único pool es el de este proceso
+        return {
+            "workers": [{"pid": os.getpid(), "browsers": browser_pool.stats()}],
+            "retiring": 0,
+        }
+    return supervisor.stats()
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        **result_cache.stats(),
+        "assets": asset_cache.stats(),
+        "locations": location_cache.stats(),
+    }
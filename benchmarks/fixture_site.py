@@ -0,0 +1,282 @@
+"""
+Sitio local que imita el flujo de Engel & Völkers que recorre scraper.py:
+banner de cookies, buscador, filtros avanzados, resultados paginados
+renderizados desde una API JSON y páginas de detalle.
+
+Uso directo:
+    python benchmarks/fixture_site.py --cards 500 --port 8765
+"""
+
+import json
+import math
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+BASE_PATH = "/co/es"
+BUNDLE_PATH = "/static/search.3f9a1c.js"
+
+FILTER_INPUTS = [
+    "price-filter",
+    "living-surface-filter",
+    "plot-surface-filter",
+    "total-surface-filter",
+    "rooms-filter",
+    "bedrooms-filter",
+    "bathrooms-filter",
+    "construction-year-filter",
+]
+
+HOME_HTML = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><title>Fixture</title></head>
+<body>
+  <form onsubmit="return false">
+    <input class="sc-7856fc0a-2 foWFcA" id="q" placeholder="Ubicación">
+    <button type="button" class="sc-a6c22956-0 fMdhBy sc-7856fc0a-4 kUdQjI"
+      onclick="location.href='{base}/search/?q=' + encodeURIComponent(document.getElementById('q').value)">
+      Buscar
+    </button>
+  </form>
+  <div id="didomi-popup">
+    <p>Usamos cookies</p>
+    <button id="didomi-notice-agree-button"
+      onclick="document.getElementById('didomi-popup').style.display='none'">Aceptar</button>
+  </div>
+</body></html>
+"""
+
+SEARCH_HTML = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><title>Resultados</title></head>
+<body>
+  <button class="sc-abdb55db-0 fBcWGp sc-d6722799-14 gCmxhq"
+    data-test-id="search-components_filter-bar_advanced-filters-button"
+    onclick="document.getElementById('filters').style.display='block'">
+    <span>Filtros</span>
+  </button>
+  <div id="filters" style="display:none">
+    <button data-test-id="search-components_advanced-filters_property-type-filter_button"
+      onclick="document.getElementById('propertyType').focus()">Tipo</button>
+    <input id="propertyType" name="propertyType">
+    <button data-test-id="search-components_advanced-filters_property-sub-type-filter_button"
+      onclick="document.getElementById('propertySubType').focus()">Subtipo</button>
+    <input id="propertySubType" name="propertySubType">
+    {inputs}
+    <button data-test-id="search-components_advanced-filters_submit-button"
+      onclick="applyFilters()">Listo</button>
+  </div>
+  <div data-test-id="search-components_result-count" id="count"></div>
+  <div class="sc-e5f1eba3-3 cGSWBa" id="results"></div>
+  <nav data-test-id="search-components_pagination" id="pagination"></nav>
+  <script id="__NEXT_DATA__" type="application/json">{hydration}</script>
+  <script src="{bundle}"></script>
+</body></html>
+"""
+
+BUNDLE_JS = """
+function applyFilters() {
+  const params = new URLSearchParams(location.search);
+  document.querySelectorAll("#filters input").forEach((input) => {
+    if (input.value) params.set(input.name, input.value);
+  });
+  params.delete("page");
+  location.href = location.pathname + "?" + params.toString();
+}
+
+function renderCard(listing) {
+  const article = document.createElement("article");
+  article.innerHTML = `
+    <div data-test-id="search-components_result-card_price">${listing.priceFormatted}</div>
+    <div data-test-id="search-components_result-card_location">${listing.location.name}</div>
+    <h3 data-test-id="search-components_result-card_headline">${listing.title}</h3>
+    <span data-test-id="search-components_result-card_feature-bedrooms">${listing.bedrooms} Habitaciones</span>
+    <span data-test-id="search-components_result-card_feature-bathrooms">${listing.bathrooms} Baños</span>
+    <div class="sc-d1d212c8-15 jCbBbQ"><a href="${listing.url}">Ver</a></div>`;
+  return article;
+}
+
+fetch("/api/search" + location.search)
+  .then((response) => response.json())
+  .then((payload) => {
+    const results = document.getElementById("results");
+    payload.listings.forEach((listing) => results.appendChild(renderCard(listing)));
+    document.getElementById("count").innerText = `${payload.total} resultados`;
+    const pagination = document.getElementById("pagination");
+    const pages = Math.ceil(payload.total / payload.pageSize);
+    for (let n = 1; n <= pages; n++) {
+      const params = new URLSearchParams(location.search);
+      params.set("page", n);
+      const link = document.createElement("a");
+      link.href = location.pathname + "?" + params.toString();
+      link.innerText = n;
+      pagination.appendChild(link);
+    }
+  });
+"""
+
+DETAIL_HTML = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><title>{title}</title>
+<meta property="og:description" content="{description}">
+<script type="application/ld+json">{ld_json}</script>
+</head>
+<body>
+  <h1>{title}</h1>
+  <div data-test-id="expose_description">{description}</div>
+  <dl>
+    <dt>Superficie habitable</dt><dd>{living} m²</dd>
+    <dt>Superficie del terreno</dt><dd>{plot} m²</dd>
+    <dt>Año de construcción</dt><dd>{year}</dd>
+  </dl>
+  <div data-test-id="expose_agent-name">Agente {agent}</div>
+</body></html>
+"""
+
+
+def make_listing(index: int) -> Dict[str, Any]:
+    """Anuncio sintético determinista para el índice dado"""
+    amount = 350_000_000 + (index * 7_919_000) % 2_500_000_000
+    return {
+        "id": f"FX-{index:05d}",
+        "price": {"amount": amount, "currency": "COP"},
+        "priceFormatted": "COP " + f"{amount:,}".replace(",", "."),
+        "title": f"Apartamento de prueba {index}",
+        "location": {"name": f"Bogotá, Zona {index % 20}"},
+        "bedrooms": 1 + index % 5,
+        "bathrooms": 1 + index % 3,
+        "livingSurface": 45 + index % 300,
+        "coordinates": {
+            "latitude": 4.6 + (index % 100) / 1000,
+            "longitude": -74.08 - (index % 100) / 1000,
+        },
+        "url": f"{BASE_PATH}/exposes/FX-{index:05d}",
+    }
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server: "FixtureServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: str, content_type: str, headers=None):
+        payload = body.encode("utf-8")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path.rstrip("/")
+
+        if path == BASE_PATH:
+            self._send(200, HOME_HTML.format(base=BASE_PATH), "text/html")
+        elif path == f"{BASE_PATH}/search":
+            inputs = "\n    ".join(
+                f'<input name="{name}-{bound}" '
+                f"data-test-id='search-components_advanced-filters_{name}_input-{bound}'>"
+                for name in FILTER_INPUTS
+                for bound in ("min", "max")
+            )
+            # Los resultados también van embebidos, como en el sitio real
+            page = int(query.get("page", ["1"])[0])
+            hydration = json.dumps(
+                {"props": {"pageProps": {"searchResult": self.server.search(page)}}}
+            ).replace("</", "<\\/")
+            html = SEARCH_HTML.format(
+                inputs=inputs, bundle=BUNDLE_PATH, hydration=hydration
+            )
+            self._send(200, html, "text/html")
+        elif path == BUNDLE_PATH:
+            self._send(
+                200,
+                BUNDLE_JS,
+                "application/javascript",
+                {"Cache-Control": "public, max-age=31536000, immutable"},
+            )
+        elif path == "/api/search":
+            page = int(query.get("page", ["1"])[0])
+            self._send(200, json.dumps(self.server.search(page)), "application/json")
+        elif path.startswith(f"{BASE_PATH}/exposes/"):
+            self._send(200, self.server.detail(path.rsplit("/", 1)[-1]), "text/html")
+        else:
+            self._send(404, "Not found", "text/plain")
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], cards: int, page_size: int):
+        super().__init__(address, FixtureHandler)
+        self.cards = cards
+        self.page_size = page_size
+        self.latency = 0.0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search(self, page: int) -> Dict[str, Any]:
+        pages = max(1, math.ceil(self.cards / self.page_size))
+        page = min(max(1, page), pages)
+        start = (page - 1) * self.page_size
+        listings: List[Dict[str, Any]] = [
+            make_listing(i)
+            for i in range(start, min(start + self.page_size, self.cards))
+        ]
+        return {
+            "total": self.cards,
+            "page": page,
+            "pageSize": self.page_size,
+            "listings": listings,
+        }
+
+    def detail(self, listing_id: str) -> str:
+        index = int(listing_id.split("-")[-1])
+        listing = make_listing(index)
+        ld_json = {
+            "@type": "Apartment",
+            "geo": listing["coordinates"],
+            "floorSize": {"value": listing["livingSurface"], "unitCode": "MTK"},
+            "yearBuilt": 1980 + index % 40,
+        }
+        return DETAIL_HTML.format(
+            title=listing["title"],
+            description=f"Descripción del anuncio {index}",
+            ld_json=json.dumps(ld_json),
+            living=listing["livingSurface"],
+            plot=listing["livingSurface"] * 2,
+            year=1980 + index % 40,
+            agent=index % 7,
+        )
+
+
+def start_fixture_site(
+    cards: int = 100, page_size: int = 50, host: str = "127.0.0.1", port: int = 0
+) -> FixtureServer:
+    """Arranca el sitio en un hilo en segundo plano y devuelve el servidor"""
+    server = FixtureServer((host, port), cards, page_size)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FixtureServer(("127.0.0.1", args.port), args.cards, args.page_size)
+    print(f"Fixture site en {server.base_url}{BASE_PATH}")
+    server.serve_forever()
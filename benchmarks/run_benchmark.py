@@ -0,0 +1,355 @@
+"""
+Benchmark offline de run_scraper contra el sitio local de benchmarks/fixture_site.py.
+
+Mide la latencia por fase, el throughput de extremo a extremo con distintos
+niveles de concurrencia y el pico de RSS (proceso + Chromium), y guarda el
+resultado en JSON para comparar entre commits.
+
+Las cachés persistentes (ubicaciones, storage state, assets y anuncios)
+viven en un directorio temporal propio y, salvo con --warm-caches, se vacían
+antes de cada nivel. El informe indica qué cachés estaban calientes al
+empezar cada nivel.
+
+Uso:
+    python benchmarks/run_benchmark.py --cards 10,100,1000 --concurrency 1,4
+    python benchmarks/run_benchmark.py --output new.json --compare old.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import asyncio
+import argparse
+import logging
+import statistics
+import subprocess
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixture_site import BASE_PATH, start_fixture_site  # noqa: E402
+
+# Funciones de scraper.py que se cronometran como fases
+PHASES = [
+    "search_via_url",
+    "search_via_ui",
+    "extract_page_cards",
+    "discover_page_count",
+    "scrape_results_page",
+]
+
+
+def _read_rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _descendants(pid: int) -> List[int]:
+    children: Dict[int, List[int]] = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+class RssSampler:
+    """Muestrea el RSS del proceso y sus descendientes y guarda el pico"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            total = sum(_read_rss_kb(p) for p in [pid, *_descendants(pid)])
+            self.peak_kb = max(self.peak_kb, total)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class PhaseTimer:
+    """Envuelve funciones async de un módulo para medir cuánto tarda cada una"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, module, name: str):
+        original = getattr(module, name)
+
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self.samples[name].append(time.perf_counter() - start)
+
+        setattr(module, name, timed)
+
+    def record(self, name: str, seconds: float):
+        self.samples[name].append(seconds)
+
+    def reset(self):
+        self.samples = defaultdict(list)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: summarize(values) for name, values in self.samples.items()}
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def isolate_caches() -> str:
+    """
+    Apunta las cachés persistentes a un directorio temporal; debe llamarse
+    antes de importar scraper, porque los módulos leen las rutas al importarse
+    """
+    directory = tempfile.mkdtemp(prefix="scraper_benchmark_")
+    os.environ["DATA_DIR"] = directory
+    os.environ["LOCATION_CACHE_PATH"] = os.path.join(directory, "locations.sqlite3")
+    os.environ["STORAGE_STATE_PATH"] = os.path.join(directory, "storage_state.json")
+    os.environ["ASSET_CACHE_DIR"] = os.path.join(directory, "assets")
+    os.environ["LISTING_DB_PATH"] = os.path.join(directory, "listings.sqlite3")
+    os.environ["JOB_DB_PATH"] = os.path.join(directory, "jobs.sqlite3")
+    return directory
+
+
+def clear_caches():
+    from interceptor import asset_cache
+    from location_cache import location_cache
+    from storage_state import storage_state_store
+
+    location_cache.clear()
+    storage_state_store.invalidate()
+    asset_cache.clear()
+
+
+def cache_warmth() -> Dict[str, bool]:
+    """Qué cachés tienen contenido antes de empezar un nivel"""
+    from interceptor import asset_cache
+    from location_cache import location_cache
+    from storage_state import storage_state_store
+
+    return {
+        "location": location_cache.stats()["entries"] > 0,
+        "storage_state": storage_state_store.load() is not None,
+        "assets": asset_cache.stats()["entries"] > 0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_level(scraper, BrowserPool, timer, args, cards, concurrency, mode):
+    """Ejecuta `requests` scrapes con `concurrency` en paralelo y devuelve métricas"""
+    timer.reset()
+    if not args.warm_caches:
+        clear_caches()
+    caches = cache_warmth()
+    pool = BrowserPool(size=1, max_concurrency=concurrency, health_check_interval=0)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await pool.start()
+        timer.record("browser_launch", time.perf_counter() - start)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        counts: List[int] = []
+
+        async def one():
+            async with semaphore:
+                t0 = time.perf_counter()
+                results = await scraper.run_scraper(
+                    location="Bogota, Colombia",
+                    pool=pool,
+                    extraction_mode=mode,
+                    navigation_mode=args.navigation_mode,
+                    page_concurrency=args.page_concurrency,
+                    pacing=args.pacing,
+                    fetch_mode=args.fetch_mode,
+                )
+                timer.record("end_to_end", time.perf_counter() - t0)
+                counts.append(len(results))
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests or concurrency)))
+        wall = time.perf_counter() - wall_start
+        await pool.close()
+
+    listings = sum(counts)
+    return {
+        "cards": cards,
+        "concurrency": concurrency,
+        "extraction_mode": mode,
+        "navigation_mode": args.navigation_mode,
+        "pacing": args.pacing,
+        "fetch_mode": args.fetch_mode,
+        "requests": len(counts),
+        "listings": listings,
+        "wall_s": wall,
+        "requests_per_s": len(counts) / wall if wall else 0,
+        "listings_per_s": listings / wall if wall else 0,
+        "peak_rss_mb": rss.peak_kb / 1024,
+        "warm_caches": sorted(name for name, warm in caches.items() if warm),
+        "phases": timer.summary(),
+    }
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Imprime la variación de wall time y throughput respecto a otra corrida"""
+
+    def key(run):
+        return (run["cards"], run["concurrency"], run["extraction_mode"])
+
+    old_runs = {key(run): run for run in previous.get("runs", [])}
+    print(f"\nComparación {previous.get('commit')} -> {current.get('commit')}")
+    for run in current["runs"]:
+        old = old_runs.get(key(run))
+        if old is None:
+            continue
+        wall = (run["wall_s"] / old["wall_s"] - 1) * 100 if old["wall_s"] else 0
+        rss = run["peak_rss_mb"] - old["peak_rss_mb"]
+        print(
+            f"cards={run['cards']:>5} conc={run['concurrency']:>2} "
+            f"mode={run['extraction_mode']:<5} wall {wall:+6.1f}%  "
+            f"rss {rss:+7.1f} MB"
+        )
+
+
+async def main(args):
+    server = start_fixture_site(cards=10, page_size=args.page_size)
+    server.latency = args.latency_ms / 1000
+    # scraper.py lee INITIAL_URL y las rutas de las cachés al importarse
+    os.environ["INITIAL_URL"] = f"{server.base_url}{BASE_PATH}"
+    cache_dir = isolate_caches()
+
+    import scraper
+    from browser_pool import BrowserPool
+
+    timer = PhaseTimer()
+    for name in PHASES:
+        timer.wrap(scraper, name)
+
+    runs = []
+    for cards in args.cards:
+        server.cards = cards
+        for mode in args.modes:
+            for concurrency in args.concurrency:
+                run = await run_level(
+                    scraper, BrowserPool, timer, args, cards, concurrency, mode
+                )
+                runs.append(run)
+                print(
+                    f"cards={cards:>5} conc={concurrency:>2} mode={mode:<5} "
+                    f"wall={run['wall_s']:.2f}s "
+                    f"listings/s={run['listings_per_s']:.1f} "
+                    f"rss={run['peak_rss_mb']:.0f}MB "
+                    f"warm={','.join(run['warm_caches']) or '-'}"
+                )
+    server.shutdown()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "page_size": args.page_size,
+        "latency_ms": args.latency_ms,
+        "warm_caches": args.warm_caches,
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--cards", type=_int_list, default=[10, 100, 1000])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 2, 4])
+    parser.add_argument(
+        "--modes", type=lambda v: v.split(","), default=["api", "batch", "dom"]
+    )
+    parser.add_argument("--navigation-mode", default="url", choices=["url", "ui"])
+    parser.add_argument(
+        "--pacing", default="fast", choices=["fast", "default", "stealth"]
+    )
+    parser.add_argument("--fetch-mode", default="browser", choices=["browser", "http"])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--page-concurrency", type=int, default=None)
+    parser.add_argument(
+        "--requests", type=int, default=None, help="scrapes por nivel (def. = conc.)"
+    )
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument(
+        "--warm-caches",
+        action="store_true",
+        help="conservar las cachés entre niveles en lugar de vaciarlas",
+    )
+    parser.add_argument(
+        "--output", default=f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    asyncio.run(main(args))
@@ -0,0 +1,437 @@
+import os
+import time
+import signal
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from playwright.async_api import async_playwright
+
+from interceptor import RequestInterceptor, asset_cache
+from metrics import BROWSER_RECYCLES, BROWSER_RSS, timed
+from storage_state import StorageStateStore, storage_state_store
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Tamaño del pool y límites de concurrencia (configurables por entorno)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+BROWSER_MAX_CONCURRENCY = int(os.getenv("BROWSER_MAX_CONCURRENCY", "4"))
+BROWSER_HEALTH_CHECK_INTERVAL = float(os.getenv("BROWSER_HEALTH_CHECK_INTERVAL", "30"))
+# Reciclaje: contextos servidos y RSS (navegador + renderers) máximos por
+# navegador; 0 desactiva cada límite
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "200"))
+BROWSER_MAX_RSS_MB = float(os.getenv("BROWSER_MAX_RSS_MB", "1500"))
+# Un navegador cuyas páginas no responden en este tiempo durante varios
+# health checks seguidos se da por colgado
+BROWSER_HEARTBEAT_TIMEOUT = float(os.getenv("BROWSER_HEARTBEAT_TIMEOUT", "10"))
+BROWSER_HEARTBEAT_FAILURES = int(os.getenv("BROWSER_HEARTBEAT_FAILURES", "3"))
+
+RECYCLE_REASONS = ("contexts", "memory", "hung", "crashed")
+
+DEFAULT_TIMEOUT = 60000
+
+LAUNCH_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",  # Ocultar webdriver
+    "--disable-infobars",
+    "--window-size=800,600",
+    "--start-maximized",
+]
+
+# Configuración del contexto con evasión de detección
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 800, "height": 600},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "java_script_enabled": True,
+    "ignore_https_errors": True,
+    "bypass_csp": True,
+    "permissions": ["geolocation"],
+    "geolocation": {
+        "latitude": 4.6097,
+        "longitude": -74.0817,
+    },  # Coordenadas de Bogotá
+    "locale": "es-CO",
+}
+
+# Script para evadir detección
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+    window.chrome = {
+        runtime: {}
+    };
+"""
+
+
+@timed("browser_launch")
+async def launch_browser(playwright):
+    """Lanza un Chromium headless con la configuración del scraper"""
+    return await playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+
+
+@timed("context_open")
+async def new_scraper_context(
+    browser,
+    state_store: Optional[StorageStateStore] = storage_state_store,
+    intercept: bool = True,
+    cache_assets: bool = True,
+    **options,
+):
+    """
+    Crea un contexto aislado con la configuración que usa run_scraper. Si hay
+    un storage state guardado, el contexto arranca con esas cookies y ese
+    localStorage (consentimiento incluido). `options` se pasan tal cual a
+    `browser.new_context` (por ejemplo `record_har_path`).
+    """
+    storage_state = state_store.load() if state_store is not None else None
+    context = await browser.new_context(
+        **CONTEXT_OPTIONS, storage_state=storage_state, **options
+    )
+
+    # Configurar timeouts más largos para simular comportamiento humano
+    context.set_default_timeout(DEFAULT_TIMEOUT)
+    context.set_default_navigation_timeout(DEFAULT_TIMEOUT)
+
+    # Solo sale el tráfico permitido; los bundles inmutables vienen de disco
+    if intercept:
+        await RequestInterceptor(cache=asset_cache if cache_assets else None).attach(
+            context
+        )
+
+    await context.add_init_script(STEALTH_SCRIPT)
+    return context
+
+
+def _read_rss(pid: int) -> Optional[int]:
+    """RSS en bytes de un proceso según /proc (solo Linux)"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class _BrowserSlot:
+    """Un navegador del pool con sus contadores de uso y de memoria"""
+
+    def __init__(self, browser, index: int):
+        self.browser = browser
+        self.index = index
+        self.launched_at = time.monotonic()
+        self.contexts_served = 0
+        self.active = 0
+        self.rss_bytes: Optional[int] = None
+        self.pids: List[int] = []
+        self.heartbeat_failures = 0
+        self._cdp = None
+
+    async def _process_info(self) -> Dict[str, Any]:
+        if self._cdp is None:
+            self._cdp = await self.browser.new_browser_cdp_session()
+        return await self._cdp.send("SystemInfo.getProcessInfo")
+
+    async def _drop_cdp(self, timeout: float):
+        """Desconecta la sesión CDP (si el navegador responde) y la olvida"""
+        cdp, self._cdp = self._cdp, None
+        if cdp is None:
+            return
+        try:
+            await asyncio.wait_for(cdp.detach(), timeout)
+        except Exception as e:
+            logger.debug(f"No se pudo cerrar la sesión CDP: {str(e)}")
+
+    async def sample_memory(self, timeout: float = BROWSER_HEARTBEAT_TIMEOUT) -> bool:
+        """
+        Suma el RSS del proceso del navegador y de sus renderers y guarda sus
+        pids. Devuelve False si el navegador no respondió a tiempo (colgado).
+        """
+        try:
+            info = await asyncio.wait_for(self._process_info(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"El navegador {self.index} no informó sus procesos")
+            # La sesión CDP puede haber quedado trabada: se abre otra
+            await self._drop_cdp(timeout)
+            return False
+        except Exception as e:
+            logger.debug(f"No se pudo leer la memoria del navegador: {str(e)}")
+            await self._drop_cdp(timeout)
+            return True
+        self.pids = [p["id"] for p in info.get("processInfo", [])]
+        sizes = [size for size in map(_read_rss, self.pids) if size is not None]
+        self.rss_bytes = sum(sizes) if sizes else None
+        if self.rss_bytes is not None:
+            BROWSER_RSS.labels(browser=str(self.index)).set(self.rss_bytes)
+        return True
+
+    async def heartbeat(self, timeout: float) -> bool:
+        """True si todas las páginas abiertas responden a tiempo"""
+        pages = [
+            page
+            for context in self.browser.contexts
+            for page in context.pages
+            if not page.is_closed()
+        ]
+        if not pages:
+            return True
+        try:
+            # Los errores (página cerrada, contexto destruido por una
+            # navegación) no son cuelgues; solo cuenta no responder
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(page.evaluate("1") for page in pages), return_exceptions=True
+                ),
+                timeout,
+            )
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self, timeout: float = 10):
+        try:
+            await asyncio.wait_for(self.browser.close(), timeout)
+        except Exception as e:
+            logger.warning(f"El navegador {self.index} no cerró, matando: {str(e)}")
+            for pid in self.pids:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "connected": self.browser.is_connected(),
+            "age_s": round(time.monotonic() - self.launched_at, 1),
+            "contexts_served": self.contexts_served,
+            "active_contexts": self.active,
+            "rss_mb": (
+                round(self.rss_bytes / (1024 * 1024), 1)
+                if self.rss_bytes is not None
+                else None
+            ),
+        }
+
+
+class BrowserPool:
+    """
+    Pool de navegadores Chromium de larga vida.
+
+    Se inicia junto con la aplicación y cada petición toma prestado un
+    BrowserContext aislado. Los navegadores caídos se reemplazan en el
+    health check periódico o al momento de prestar un contexto.
+
+    Cada navegador se recicla tras `max_contexts` contextos o cuando su RSS
+    supera `max_rss_mb`: deja de recibir contextos, uno nuevo toma su lugar y
+    se cierra al terminar los que tiene en curso. Si sus páginas dejan de
+    responder al heartbeat se cierra (o se mata) de inmediato.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_concurrency: int = BROWSER_MAX_CONCURRENCY,
+        health_check_interval: float = BROWSER_HEALTH_CHECK_INTERVAL,
+        max_contexts: int = BROWSER_MAX_CONTEXTS,
+        max_rss_mb: float = BROWSER_MAX_RSS_MB,
+        heartbeat_timeout: float = BROWSER_HEARTBEAT_TIMEOUT,
+        heartbeat_failures: int = BROWSER_HEARTBEAT_FAILURES,
+    ):
+        self.size = max(1, size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.health_check_interval = health_check_interval
+        self.max_contexts = max_contexts
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_failures = max(1, heartbeat_failures)
+        self._playwright = None
+        self._slots: List[_BrowserSlot] = []
+        self._draining: List[_BrowserSlot] = []
+        self._next = 0
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._health_task: Optional[asyncio.Task] = None
+        # Reciclajes por navegador (posición en el pool) y motivo
+        self.recycles: List[Dict[str, int]] = []
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        if self.started:
+            return
+        self._playwright = await async_playwright().start()
+        for index in range(self.size):
+            self._slots.append(await self._launch_slot(index))
+            self.recycles.append({reason: 0 for reason in RECYCLE_REASONS})
+        if self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(
+            f"Browser pool iniciado: {self.size} navegadores, "
+            f"concurrencia máxima {self.max_concurrency}"
+        )
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        for slot in [*self._slots, *self._draining]:
+            try:
+                await slot.close()
+            except Exception as e:
+                logger.warning(f"Error cerrando navegador: {str(e)}")
+        self._slots, self._draining = [], []
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("Browser pool cerrado")
+
+    async def health_check(self) -> int:
+        """
+        Reemplaza los navegadores desconectados o colgados y recicla los que
+        superan el límite de memoria. Devuelve cuántos se reemplazaron.
+        """
+        slots = [*self._slots, *self._draining]
+
+        async def probe(slot: _BrowserSlot) -> bool:
+            responsive, answered = await asyncio.gather(
+                slot.heartbeat(self.heartbeat_timeout),
+                slot.sample_memory(self.heartbeat_timeout),
+            )
+            return responsive and answered
+
+        # Heartbeats y memoria fuera del lock para no frenar los préstamos
+        alive = await asyncio.gather(*(probe(slot) for slot in slots))
+        for slot, responsive in zip(slots, alive):
+            slot.heartbeat_failures = 0 if responsive else slot.heartbeat_failures + 1
+
+        replaced = 0
+        async with self._lock:
+            for slot in slots:
+                if slot not in self._slots:
+                    continue
+                reason = self._recycle_reason(slot)
+                if reason is not None:
+                    await self._recycle(slot, reason)
+                    replaced += 1
+        # Los que se están drenando se cierran al quedar libres o si se cuelgan
+        for slot in list(self._draining):
+            if (
+                slot.active == 0
+                or not slot.browser.is_connected()
+                or slot.heartbeat_failures >= self.heartbeat_failures
+            ):
+                await self._close_drained(slot)
+        return replaced
+
+    def _recycle_reason(self, slot: _BrowserSlot) -> Optional[str]:
+        if not slot.browser.is_connected():
+            return "crashed"
+        if slot.heartbeat_failures >= self.heartbeat_failures:
+            return "hung"
+        if self.max_rss_bytes > 0 and (slot.rss_bytes or 0) > self.max_rss_bytes:
+            return "memory"
+        if self.max_contexts > 0 and slot.contexts_served >= self.max_contexts:
+            return "contexts"
+        return None
+
+    async def _recycle(self, slot: _BrowserSlot, reason: str):
+        """Pone un navegador nuevo en la posición del slot; el viejo se drena o se cierra"""
+        index = slot.index
+        self.recycles[index][reason] += 1
+        BROWSER_RECYCLES.labels(reason=reason).inc()
+        logger.warning(
+            f"Reciclando navegador {index} ({reason}) tras "
+            f"{slot.contexts_served} contextos"
+        )
+        self._slots[index] = await self._launch_slot(index)
+        if reason in ("crashed", "hung") or slot.active == 0:
+            # Las peticiones en curso en un navegador colgado fallan en vez
+            # de quedarse esperando para siempre
+            await slot.close()
+        else:
+            self._draining.append(slot)
+
+    async def _launch_slot(self, index: int) -> _BrowserSlot:
+        slot = _BrowserSlot(await launch_browser(self._playwright), index)
+        # Muestrear enseguida deja los pids listos por si hay que matarlo
+        # antes del primer health check
+        await slot.sample_memory(self.heartbeat_timeout)
+        return slot
+
+    async def _close_drained(self, slot: _BrowserSlot):
+        if slot in self._draining:
+            self._draining.remove(slot)
+            await slot.close()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.error(f"Error en el health check del pool: {str(e)}")
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            index = self._next % len(self._slots)
+            self._next += 1
+            slot = self._slots[index]
+            reason = self._recycle_reason(slot)
+            if reason is not None:
+                await self._recycle(slot, reason)
+                slot = self._slots[index]
+            slot.contexts_served += 1
+            slot.active += 1
+            return slot
+
+    @asynccontextmanager
+    async def context(self, **options):
+        """
+        Presta un BrowserContext aislado; se cierra al salir del bloque. Las
+        `options` van a new_scraper_context.
+        """
+        if not self.started:
+            raise RuntimeError("Browser pool no iniciado")
+
+        async with self._semaphore:
+            slot = await self._acquire_slot()
+            try:
+                context = await new_scraper_context(slot.browser, **options)
+                try:
+                    yield context
+                finally:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"Error cerrando contexto: {str(e)}")
+            finally:
+                slot.active -= 1
+                if slot.active == 0 and slot in self._draining:
+                    await self._close_drained(slot)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Memoria, uso y reciclajes de cada navegador del pool"""
+        return [
+            {**slot.stats(), "recycles": dict(self.recycles[slot.index])}
+            for slot in self._slots
+        ]
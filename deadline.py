@@ -0,0 +1,101 @@
+import time
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Se agotó el presupuesto de tiempo de la petición"""
+
+    def __init__(self, partial: Optional[List[Dict[str, Any]]] = None):
+        super().__init__("Se agotó el tiempo de la petición")
+        # Propiedades obtenidas antes de cortar
+        self.partial = partial or []
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """Instante (reloj monotónico) en que vence un presupuesto de `seconds`"""
+    if seconds is None or seconds <= 0:
+        return None
+    return time.monotonic() + seconds
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Segundos que quedan, o None si no hay deadline"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def budget_ms(deadline: Optional[float], timeout: int) -> int:
+    """Recorta un timeout de Playwright (ms) a lo que queda del presupuesto"""
+    left = remaining(deadline)
+    if left is None:
+        return timeout
+    # Playwright interpreta 0 como "sin timeout"
+    return max(1, min(timeout, int(left * 1000)))
+
+
+def apply_budget(page, deadline: Optional[float], timeout: int):
+    """Ajusta los timeouts por defecto de la página al presupuesto restante"""
+    if deadline is None:
+        return
+    page.set_default_timeout(budget_ms(deadline, timeout))
+    page.set_default_navigation_timeout(budget_ms(deadline, timeout))
+
+
+async def within(awaitable: Awaitable[T], deadline: Optional[float]) -> T:
+    """Espera `awaitable` sin pasar del deadline; al vencer lanza DeadlineExceeded"""
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, remaining(deadline))
+    except asyncio.TimeoutError:
+        logger.warning("Deadline alcanzado durante la espera")
+        raise DeadlineExceeded()
+
+
+async def iter_until(
+    source: AsyncIterator[Dict[str, Any]], deadline: Optional[float]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Entrega los elementos de `source` hasta el deadline. Al vencer cancela el
+    trabajo en curso (lo que cierra páginas y contextos) y lanza
+    DeadlineExceeded.
+    """
+    async with aclosing(source) as items:
+        if deadline is None:
+            async for item in items:
+                yield item
+            return
+
+        while True:
+            left = remaining(deadline)
+            if left is not None and left <= 0:
+                raise DeadlineExceeded()
+            try:
+                item = await asyncio.wait_for(items.__anext__(), left)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                logger.warning("Deadline alcanzado, se devuelven resultados parciales")
+                raise DeadlineExceeded()
+            yield item
+
+
+async def collect(source: AsyncIterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Junta los elementos; si vence el deadline, los adjunta a la excepción"""
+    results = []
+    try:
+        async with aclosing(source) as items:
+            async for item in items:
+                results.append(item)
+    except DeadlineExceeded as e:
+        e.partial = results
+        raise
+    return results
@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urljoin
+
+from dotenv import load_dotenv
+
+from metrics import timed
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DETAIL_CONCURRENCY = int(os.getenv("DETAIL_CONCURRENCY", "3"))
+# Páginas de detalle por segundo que se abren como máximo en el proceso
+DETAIL_RATE_LIMIT = float(os.getenv("DETAIL_RATE_LIMIT", "2"))
+DETAIL_CACHE_TTL = float(os.getenv("DETAIL_CACHE_TTL", str(24 * 3600)))
+DETAIL_CACHE_MAX_ENTRIES = int(os.getenv("DETAIL_CACHE_MAX_ENTRIES", "5000"))
+DETAIL_CACHE_DIR = os.getenv("DETAIL_CACHE_DIR") or None
+
+# Lee en una sola evaluación los datos estructurados, la tabla de
+# características, la descripción y el agente de la página de detalle
+EXTRACT_DETAIL_JS = """
+() => {
+    const text = (selector) => {
+        const el = document.querySelector(selector);
+        return el ? el.innerText.trim() : null;
+    };
+    const ldJson = Array.from(
+        document.querySelectorAll("script[type='application/ld+json']")
+    ).map((el) => el.textContent);
+    const facts = {};
+    document.querySelectorAll("dl").forEach((dl) => {
+        const terms = dl.querySelectorAll("dt");
+        const values = dl.querySelectorAll("dd");
+        terms.forEach((dt, i) => {
+            if (values[i]) facts[dt.innerText.trim()] = values[i].innerText.trim();
+        });
+    });
+    document.querySelectorAll("[data-test-id*='key-facts'] li, [data-test-id*='facts'] li")
+        .forEach((li) => {
+            const parts = li.innerText.split("\\n").map((p) => p.trim()).filter(Boolean);
+            if (parts.length >= 2) facts[parts[0]] = parts.slice(1).join(" ");
+        });
+    const meta = (name) => {
+        const el = document.querySelector(`meta[property='${name}'], meta[name='${name}']`);
+        return el ? el.getAttribute("content") : null;
+    };
+    return {
+        ldJson,
+        facts,
+        description: text("[data-test-id*='description']") || meta("og:description"),
+        agent: text("[data-test-id*='agent-name']") || text("[data-test-id*='contact'] h3"),
+        latitude: meta("place:location:latitude"),
+        longitude: meta("place:location:longitude"),
+    };
+}
+"""
+
+# Etiquetas (en minúsculas) de la tabla de características para cada campo
+FACT_LABELS = {
+    "living_surface": ["superficie habitable", "área construida", "living area"],
+    "plot_surface": ["superficie del terreno", "área del lote", "plot area"],
+    "total_surface": ["superficie total", "área total", "total area"],
+    "construction_year": ["año de construcción", "construction year"],
+}
+
+
+class RateLimiter:
+    """Espacia las aperturas de páginas para no superar `rate` por segundo"""
+
+    def __init__(self, rate: float = DETAIL_RATE_LIMIT):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(loop.time(), self._next) + self.interval
+
+
+detail_cache = ResultCache(
+    ttl=DETAIL_CACHE_TTL,
+    max_entries=DETAIL_CACHE_MAX_ENTRIES,
+    directory=DETAIL_CACHE_DIR,
+)
+detail_limiter = RateLimiter()
+
+
+def _iter_ld_nodes(raw_blocks):
+    for raw in raw_blocks:
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, dict):
+                yield node
+                stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+
+
+def parse_detail(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte lo leído de la página de detalle en campos del registro"""
+    detail: Dict[str, Any] = {
+        "description": raw.get("description"),
+        "agent": raw.get("agent"),
+        "latitude": raw.get("latitude"),
+        "longitude": raw.get("longitude"),
+    }
+
+    for node in _iter_ld_nodes(raw.get("ldJson") or []):
+        geo = node.get("geo")
+        if isinstance(geo, dict):
+            detail["latitude"] = detail["latitude"] or geo.get("latitude")
+            detail["longitude"] = detail["longitude"] or geo.get("longitude")
+        floor_size = node.get("floorSize")
+        if isinstance(floor_size, dict) and floor_size.get("value"):
+            detail.setdefault("living_surface", str(floor_size["value"]))
+        if node.get("yearBuilt"):
+            detail.setdefault("construction_year", str(node["yearBuilt"]))
+        if not detail["description"] and isinstance(node.get("description"), str):
+            detail["description"] = node["description"]
+
+    facts = {k.strip().lower(): v for k, v in (raw.get("facts") or {}).items()}
+    for field, labels in FACT_LABELS.items():
+        for label, value in facts.items():
+            if any(label.startswith(candidate) for candidate in labels):
+                detail.setdefault(field, value)
+                break
+
+    if detail.get("construction_year"):
+        match = re.search(r"\d{4}", str(detail["construction_year"]))
+        detail["construction_year"] = match.group(0) if match else None
+
+    return {k: v for k, v in detail.items() if v not in (None, "")}
+
+
+@timed("detail_page")
+async def fetch_detail(
+    context, url: str, limiter: RateLimiter = detail_limiter
+) -> Dict[str, Any]:
+    """Abre la página de detalle en una pestaña del contexto y la analiza"""
+    await limiter.wait()
+    page = await context.new_page()
+    try:
+        await page.goto(url, wait_until="domcontentloaded")
+        return parse_detail(await page.evaluate(EXTRACT_DETAIL_JS))
+    finally:
+        await page.close()
+
+
+async def enrich_property(
+    context,
+    property_data: Dict[str, Any],
+    base_url: str,
+    semaphore: asyncio.Semaphore,
+    cache: ResultCache = detail_cache,
+) -> Dict[str, Any]:
+    """Completa la propiedad con su página de detalle, usando la caché por URL"""
+    if not property_data.get("url"):
+        return property_data
+
+    url = urljoin(base_url, property_data["url"])
+
+    async def load():
+        async with semaphore:
+            return await fetch_detail(context, url)
+
+    try:
+        detail = await cache.get_or_compute(url, load)
+    except Exception as e:
+        logger.warning(f"No se pudo enriquecer {url}: {str(e)}")
+        return property_data
+
+    enriched = dict(property_data)
+    for key, value in detail.items():
+        enriched.setdefault(key, value)
+    return enriched
+
+
+async def iter_enriched(
+    context,
+    properties: AsyncIterator[Dict[str, Any]],
+    base_url: str,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Enriquece las propiedades a medida que llegan con un número acotado de
+    pestañas de detalle concurrentes. Las entrega en orden de finalización.
+    """
+    concurrency = max(1, concurrency or DETAIL_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+    try:
+        async with aclosing(properties) as source:
+            async for property_data in source:
+                pending.add(
+                    asyncio.create_task(
+                        enrich_property(context, property_data, base_url, semaphore)
+                    )
+                )
+                # Evitar acumular demasiadas tareas si la lista es muy larga
+                if len(pending) >= concurrency * 2:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import base64
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Directorio donde se guardan las grabaciones (HAR + resultados)
+HAR_DIR = os.getenv("HAR_DIR", os.path.join(os.getenv("DATA_DIR", "."), "hars"))
+# Latencia fija (ms) que se simula en cada respuesta al reproducir; vacío = 0
+HAR_REPLAY_LATENCY = float(os.getenv("HAR_REPLAY_LATENCY") or 0)
+
+# "live" navega normalmente, "record" guarda el tráfico y los resultados y
+# "replay" sirve todo desde una grabación sin salir a la red
+HAR_MODES = ("live", "record", "replay")
+
+HAR_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+# El cuerpo del HAR ya viene decodificado; Playwright calcula la longitud
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+def fulfill_headers(pairs: List[Dict[str, str]]) -> Dict[str, str]:
+    """
+    Junta los pares nombre/valor del HAR en el dict que acepta route.fulfill
+    sin perder cabeceras repetidas: Playwright separa set-cookie por saltos
+    de línea y el resto se une con comas, como permite HTTP.
+    """
+    headers: Dict[str, str] = {}
+    names: Dict[str, str] = {}
+    for header in pairs:
+        lower = header["name"].lower()
+        if lower in DROPPED_HEADERS:
+            continue
+        name = names.setdefault(lower, header["name"])
+        if name in headers:
+            separator = "\n" if lower == "set-cookie" else ", "
+            headers[name] = f"{headers[name]}{separator}{header['value']}"
+        else:
+            headers[name] = header["value"]
+    return headers
+
+
+def har_paths(name: str, directory: str = HAR_DIR) -> Tuple[str, str]:
+    """Rutas del HAR y del JSON de resultados de una grabación"""
+    if not HAR_NAME_RE.match(name or "") or name.startswith("."):
+        raise ValueError(f"Nombre de grabación no válido: {name}")
+    base = os.path.join(directory, name)
+    return f"{base}.har", f"{base}.results.json"
+
+
+def save_results(path: str, params: Dict[str, Any], results: List[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"params": params, "results": results},
+            f,
+            ensure_ascii=False,
+            indent=2,
+            default=str,
+        )
+
+
+def load_results(path: str) -> Optional[List[Dict[str, Any]]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class HarReplayer:
+    """
+    Sirve todas las peticiones de un contexto desde un HAR grabado, sin red.
+    Las peticiones repetidas consumen las entradas en el orden en que se
+    grabaron (la última se repite al agotarse); lo que no está en el HAR, o
+    solo figura como abortado, se aborta. Opcionalmente espera una latencia
+    fija antes de cada respuesta.
+    """
+
+    def __init__(self, har: Dict[str, Any], latency_ms: float = HAR_REPLAY_LATENCY):
+        self.latency_ms = latency_ms or 0
+        self._by_body: Dict[Tuple[str, str, str], List[Dict]] = defaultdict(list)
+        self._by_url: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        self._served: Dict[int, int] = defaultdict(int)
+        self.counts = {"served": 0, "missing": 0}
+
+        for entry in har.get("log", {}).get("entries", []):
+            # Las peticiones abortadas se graban con status 0 o negativo
+            if entry.get("response", {}).get("status", 0) <= 0:
+                continue
+            request = entry["request"]
+            method, url = request["method"], request["url"]
+            body = (request.get("postData") or {}).get("text") or ""
+            self._by_body[(method, url, body)].append(entry)
+            self._by_url[(method, url)].append(entry)
+
+    @classmethod
+    def load(cls, path: str, latency_ms: float = HAR_REPLAY_LATENCY) -> "HarReplayer":
+        if not os.path.exists(path):
+            raise ValueError(f"No existe la grabación {path}")
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), latency_ms)
+
+    def _next_entry(self, request) -> Optional[Dict[str, Any]]:
+        candidates = self._by_body.get(
+            (request.method, request.url, request.post_data or "")
+        ) or self._by_url.get((request.method, request.url))
+        if not candidates:
+            return None
+        key = id(candidates)
+        entry = candidates[min(self._served[key], len(candidates) - 1)]
+        self._served[key] += 1
+        return entry
+
+    async def attach(self, context):
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        entry = self._next_entry(route.request)
+        if entry is None:
+            self.counts["missing"] += 1
+            logger.debug(f"Sin respuesta grabada para {route.request.url}")
+            await route.abort()
+            return
+
+        response = entry["response"]
+        content = response.get("content", {})
+        text = content.get("text") or ""
+        if content.get("encoding") == "base64":
+            body = base64.b64decode(text)
+        else:
+            body = text.encode("utf-8")
+        headers = fulfill_headers(response.get("headers", []))
+
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self.counts["served"] += 1
+        await route.fulfill(status=response["status"], headers=headers, body=body)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counts)
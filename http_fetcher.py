@@ -0,0 +1,169 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from api_capture import find_listings, find_total, parse_api_listing
+from browser_pool import CONTEXT_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+# Páginas de resultados que se piden en paralelo por búsqueda
+HTTP_PAGE_CONCURRENCY = int(os.getenv("HTTP_PAGE_CONCURRENCY", "5"))
+
+HTTP_HEADERS = {
+    "User-Agent": CONTEXT_OPTIONS["user_agent"],
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-CO,es;q=0.9,en;q=0.8",
+}
+
+# Bloques de datos de hidratación que los frameworks dejan en el HTML
+HYDRATION_PATTERNS = [
+    re.compile(
+        r"<script[^>]*id=[\"']__NEXT_DATA__[\"'][^>]*>(.*?)</script>", re.S | re.I
+    ),
+    re.compile(
+        r"<script[^>]*type=[\"']application/json[\"'][^>]*>(.*?)</script>", re.S
+    ),
+    re.compile(
+        r"window\.__(?:INITIAL_STATE|PRELOADED_STATE|APOLLO_STATE|NUXT)__\s*=\s*"
+        r"(\{.*?\})\s*;?\s*</script>",
+        re.S,
+    ),
+]
+
+# Estados y textos típicos de las páginas de desafío anti-bots
+CHALLENGE_STATUSES = (403, 429, 503)
+CHALLENGE_MARKERS = (
+    "challenge-platform",
+    "cf-chl",
+    "just a moment",
+    "captcha-delivery",
+    "px-captcha",
+    "datadome",
+)
+
+
+class FastPathUnavailable(Exception):
+    """La página no se puede leer sin navegador (desafío o sin datos embebidos)"""
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente compartido con keep-alive y HTTP/2 para todo el proceso"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers=HTTP_HEADERS,
+            follow_redirects=True,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def extract_hydration_payloads(html: str) -> List[Any]:
+    payloads = []
+    for pattern in HYDRATION_PATTERNS:
+        for raw in pattern.findall(html):
+            try:
+                payloads.append(json.loads(raw))
+            except ValueError:
+                continue
+    return payloads
+
+
+def parse_search_html(html: str) -> Tuple[List[Dict[str, Any]], Optional[int], Any]:
+    """
+    Anuncios (en el formato de las cards), total de resultados y el payload de
+    hidratación del que salieron, para comprobar los filtros aplicados. Si los
+    datos de hidratación declaran cero resultados se devuelve una página vacía.
+    """
+    payloads = extract_hydration_payloads(html)
+    for payload in payloads:
+        listings = find_listings(payload)
+        if listings:
+            return (
+                [parse_api_listing(item) for item in listings],
+                find_total(payload),
+                payload,
+            )
+    # Una búsqueda sin resultados es una respuesta válida, no un fallo
+    for payload in payloads:
+        if find_total(payload) == 0:
+            return [], 0, payload
+
+    lowered = html.lower()
+    if any(marker in lowered for marker in CHALLENGE_MARKERS):
+        raise FastPathUnavailable("Página de desafío anti-bots")
+    raise FastPathUnavailable("El HTML no trae anuncios embebidos")
+
+
+async def fetch_search_page(
+    url: str, timeout: Optional[float] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int], Any]:
+    """Descarga una página de resultados y lee sus anuncios sin navegador"""
+    try:
+        if timeout is not None:
+            timeout = min(timeout, HTTP_TIMEOUT)
+        response = await get_client().get(
+            url, timeout=HTTP_TIMEOUT if timeout is None else timeout
+        )
+    except httpx.HTTPError as e:
+        raise FastPathUnavailable(f"Error HTTP: {str(e)}")
+
+    if response.status_code in CHALLENGE_STATUSES:
+        raise FastPathUnavailable(f"Respuesta {response.status_code} del sitio")
+    if not response.is_success:
+        raise FastPathUnavailable(f"Estado inesperado {response.status_code}")
+    return parse_search_html(response.text)
+
+
+async def iter_search_pages(
+    urls: List[str], concurrency: int = HTTP_PAGE_CONCURRENCY, ordered: bool = False
+) -> AsyncIterator[Optional[List[Dict[str, Any]]]]:
+    """
+    Descarga las páginas en paralelo y entrega cada una al terminar, o en el
+    orden de `urls` con `ordered`. Una página que falla se entrega como None.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(url: str) -> Optional[List[Dict[str, Any]]]:
+        async with semaphore:
+            try:
+                listings, _, _ = await fetch_search_page(url)
+                return listings
+            except FastPathUnavailable as e:
+                logger.warning(f"No se pudo leer {url} por HTTP: {str(e)}")
+                return None
+
+    tasks = [asyncio.create_task(fetch(url)) for url in urls]
+    try:
+        for next_page in tasks if ordered else asyncio.as_completed(tasks):
+            yield await next_page
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
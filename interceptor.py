@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+from metrics import INTERCEPTED_BYTES, INTERCEPTED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [v.strip().lower() for v in os.getenv(name, default).split(",") if v.strip()]
+
+
+def _site_domain() -> str:
+    host = urlparse(
+        os.getenv("INITIAL_URL", "https://www.engelvoelkers.com/co/es")
+    ).hostname
+    host = host or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+# Dominios (y sus subdominios) a los que se deja salir el tráfico: el sitio
+# y el gestor de consentimiento de cookies. "*" permite cualquier dominio
+INTERCEPT_ALLOWED_DOMAINS = _env_list(
+    "INTERCEPT_ALLOWED_DOMAINS", f"{_site_domain()},privacy-center.org"
+)
+# Tipos de recurso permitidos dentro de esos dominios
+INTERCEPT_ALLOWED_RESOURCE_TYPES = set(
+    _env_list(
+        "INTERCEPT_ALLOWED_RESOURCE_TYPES", "document,script,stylesheet,xhr,fetch"
+    )
+)
+
+# Caché en disco de bundles JS/CSS inmutables; vacío la desactiva
+ASSET_CACHE_DIR = os.getenv(
+    "ASSET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "scraper_assets")
+)
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+CACHEABLE_RESOURCE_TYPES = ("script", "stylesheet")
+# Nombre de archivo con hash de contenido: app.3f9a1c.js, main-4b2e91ad.css
+HASHED_ASSET_RE = re.compile(r"[.\-_][0-9a-f]{6,}\.(?:min\.)?(?:js|css)$")
+# Cabeceras de la respuesta original que se conservan al servir desde la caché
+KEPT_HEADERS = ("content-type", "cache-control", "etag", "last-modified")
+
+
+def is_allowed_host(host: str, domains: List[str] = INTERCEPT_ALLOWED_DOMAINS) -> bool:
+    host = (host or "").lower()
+    if "*" in domains:
+        return True
+    return any(host == d or host.endswith(f".{d}") for d in domains)
+
+
+def is_immutable_asset(url: str, headers: Dict[str, str]) -> bool:
+    """Un bundle se puede cachear si se declara inmutable o lleva hash en el nombre"""
+    if "immutable" in headers.get("cache-control", ""):
+        return True
+    return bool(HASHED_ASSET_RE.search(urlparse(url).path.lower()))
+
+
+class AssetCache:
+    """
+    Caché en disco de recursos estáticos inmutables, compartida por todos los
+    contextos del proceso. Se desaloja por LRU al superar `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = ASSET_CACHE_DIR,
+        max_bytes: int = ASSET_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key)
+        return f"{base}.body", f"{base}.json"
+
+    def _load_index(self):
+        # Reconstruir el orden LRU a partir de la fecha de modificación
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".body"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[: -len(".body")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        self._evict()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        if not self.directory:
+            return None
+        key = self.key(url)
+        if key not in self._index:
+            return None
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+        self._index.move_to_end(key)
+        return meta, body
+
+    def set(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        if not self.directory or len(body) > self.max_bytes:
+            return
+        key = self.key(url)
+        body_path, meta_path = self._paths(key)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k in KEPT_HEADERS},
+        }
+        try:
+            with open(body_path, "wb") as f:
+                f.write(body)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar {url} en la caché de assets: {str(e)}")
+            return
+        self._bytes -= self._index.pop(key, 0)
+        self._index[key] = len(body)
+        self._bytes += len(body)
+        self._evict()
+
+    def _remove(self, key: str):
+        self._bytes -= self._index.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            self._remove(next(iter(self._index)))
+
+    def clear(self):
+        for key in list(self._index):
+            self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._index), "bytes": self._bytes}
+
+
+asset_cache = AssetCache()
+
+
+class RequestInterceptor:
+    """
+    Filtra el tráfico de un contexto con la lista de dominios y tipos de
+    recurso permitidos, sirve los bundles inmutables desde la AssetCache (si
+    se le da una) y lleva la cuenta de peticiones y bytes bloqueados,
+    servidos desde caché o descargados.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[AssetCache] = asset_cache,
+        domains: List[str] = INTERCEPT_ALLOWED_DOMAINS,
+        resource_types=INTERCEPT_ALLOWED_RESOURCE_TYPES,
+    ):
+        self.cache = cache
+        self.domains = domains
+        self.resource_types = resource_types
+        self.counts = {
+            outcome: {"requests": 0, "bytes": 0}
+            for outcome in ("blocked", "cached", "fetched")
+        }
+        # Peticiones ya contadas al servirlas desde la ruta
+        self._counted = weakref.WeakSet()
+
+    async def attach(self, context):
+        await context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+        _interceptors[context] = self
+
+    def _count(self, outcome: str, size: int = 0):
+        self.counts[outcome]["requests"] += 1
+        self.counts[outcome]["bytes"] += size
+        INTERCEPTED_REQUESTS.labels(outcome=outcome).inc()
+        if size:
+            INTERCEPTED_BYTES.labels(outcome=outcome).inc(size)
+
+    def allows(self, request) -> bool:
+        if request.resource_type not in self.resource_types:
+            return False
+        return is_allowed_host(urlparse(request.url).hostname, self.domains)
+
+    async def _handle(self, route):
+        request = route.request
+        if not self.allows(request):
+            # No se descarga, así que no hay bytes que contar
+            self._count("blocked")
+            await route.abort()
+            return
+
+        if (
+            self.cache is None
+            or request.resource_type not in CACHEABLE_RESOURCE_TYPES
+            or request.method != "GET"
+        ):
+            await route.continue_()
+            return
+
+        cached = self.cache.get(request.url)
+        if cached is not None:
+            meta, body = cached
+            self._counted.add(request)
+            self._count("cached", len(body))
+            await route.fulfill(
+                status=meta["status"], headers=meta["headers"], body=body
+            )
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            logger.debug(f"No se pudo descargar {request.url}: {str(e)}")
+            await route.abort()
+            return
+        self._counted.add(request)
+        self._count("fetched", len(body))
+        if response.status == 200 and is_immutable_asset(request.url, response.headers):
+            self.cache.set(request.url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
+
+    def _on_response(self, response):
+        if response.request in self._counted:
+            return
+        try:
+            size = int(response.headers.get("content-length") or 0)
+        except ValueError:
+            size = 0
+        self._count("fetched", size)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {outcome: dict(values) for outcome, values in self.counts.items()}
+
+
+_interceptors: "weakref.WeakKeyDictionary[Any, RequestInterceptor]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def interceptor_for(context) -> Optional[RequestInterceptor]:
+    """Interceptor instalado en el contexto, si lo hay"""
+    return _interceptors.get(context)
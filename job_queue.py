@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "100"))
+# Directorio escribible para los archivos persistentes (volumen en Docker)
+DATA_DIR = os.getenv("DATA_DIR", ".")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(DATA_DIR, "jobs.sqlite3"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))
+
+PRIORITIES = {"low": 0, "normal": 1, "high": 2}
+
+
+class QueueFullError(Exception):
+    """La cola alcanzó su profundidad máxima"""
+
+
+class JobQueue:
+    """
+    Cola de trabajos de scraping persistida en SQLite y atendida por un número
+    fijo de workers. Los trabajos que estaban en curso al reiniciar vuelven a
+    la cola.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Dict[str, Any]], Awaitable[Any]],
+        workers: int = JOB_WORKERS,
+        max_depth: int = JOB_QUEUE_MAX_DEPTH,
+        db_path: str = JOB_DB_PATH,
+        retention: float = JOB_RETENTION,
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.db_path = db_path
+        self.retention = retention
+        self._db: Optional[sqlite3.Connection] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Condition()
+
+    async def start(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        # WAL y timeout de bloqueo, igual que el almacén de anuncios
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                params TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at)"
+        )
+        # Los trabajos interrumpidos por un reinicio vuelven a la cola
+        requeued = self._db.execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+        ).rowcount
+        self._db.commit()
+        if requeued:
+            logger.info(f"{requeued} trabajos interrumpidos vuelven a la cola")
+
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"Cola de trabajos iniciada con {self.workers} workers")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def depth(self) -> int:
+        row = self._db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+        ).fetchone()
+        return row[0]
+
+    async def submit(self, params: Dict[str, Any], priority: str = "normal") -> str:
+        """Encola un trabajo y devuelve su id. Lanza QueueFullError si no hay cupo"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridad no soportada: {priority}")
+        if self.depth() >= self.max_depth:
+            raise QueueFullError("La cola de trabajos está llena")
+
+        self._purge()
+        job_id = uuid.uuid4().hex
+        self._db.execute(
+            "INSERT INTO jobs (id, status, priority, params, created_at) "
+            "VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, PRIORITIES[priority], json.dumps(params), time.time()),
+        )
+        self._db.commit()
+
+        async with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "priority": next(k for k, v in PRIORITIES.items() if v == row["priority"]),
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["status"] == "queued":
+            job["position"] = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+                "(priority > ? OR (priority = ? AND created_at < ?))",
+                (row["priority"], row["priority"], row["created_at"]),
+            ).fetchone()[0]
+        if row["result"] is not None:
+            job["data"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    def _purge(self):
+        self._db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - self.retention,),
+        )
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        row = self._db.execute(
+            "SELECT id, params FROM jobs WHERE status = 'queued' "
+            "ORDER BY priority DESC, created_at LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+            (time.time(), row["id"]),
+        )
+        self._db.commit()
+        return row
+
+    def _finish(self, job_id: str, result: Any = None, error: Optional[str] = None):
+        self._db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ?",
+            (
+                "failed" if error is not None else "done",
+                json.dumps(result) if error is None else None,
+                error,
+                time.time(),
+                job_id,
+            ),
+        )
+        self._db.commit()
+
+    async def _worker(self, index: int):
+        while True:
+            job = self._claim_next()
+            if job is None:
+                async with self._wakeup:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                    except asyncio.TimeoutError:
+                        pass
+                continue
+
+            logger.info(f"Worker {index} procesando el trabajo {job['id']}")
+            try:
+                result = await self.runner(json.loads(job["params"]))
+                self._finish(job["id"], result=result)
+            except asyncio.CancelledError:
+                # Se deja en 'running' para que vuelva a la cola al reiniciar
+                raise
+            except Exception as e:
+                logger.error(f"Error en el trabajo {job['id']}: {str(e)}")
+                self._finish(job["id"], error=str(e))
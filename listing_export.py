@@ -0,0 +1,144 @@
+import io
+import os
+import csv
+import logging
+from typing import Iterator, List
+
+from dotenv import load_dotenv
+
+from listing_record import RECORD_FIELDS, ListingRecord
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Filas por record batch (Arrow), row group (Parquet) o bloque (CSV)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_FORMATS = ("arrow", "parquet", "csv")
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+}
+FILE_EXTENSIONS = {"arrow": "arrows", "parquet": "parquet", "csv": "csv"}
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    types = {
+        "price_amount": pa.int64(),
+        "bedrooms": pa.int32(),
+        "bathrooms": pa.int32(),
+        "construction_year": pa.int32(),
+        "living_surface": pa.float64(),
+        "plot_surface": pa.float64(),
+        "total_surface": pa.float64(),
+        "latitude": pa.float64(),
+        "longitude": pa.float64(),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in RECORD_FIELDS])
+
+
+def _chunks(records: List[ListingRecord], size: int) -> Iterator[List[ListingRecord]]:
+    for start in range(0, len(records), max(1, size)):
+        yield records[start : start + size]
+
+
+class _Drain(io.RawIOBase):
+    """Destino de escritura que entrega lo escrito por partes"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        # Parquet necesita la posición para calcular los offsets del footer
+        return self._position
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _record_batch(records: List[ListingRecord], schema):
+    import pyarrow as pa
+
+    # Columna por columna, sin pasar por un dict por fila
+    columns = [
+        pa.array([getattr(r, name) for r in records], type=schema.field(name).type)
+        for name in RECORD_FIELDS
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def iter_arrow(
+    records: List[ListingRecord], batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Stream Arrow IPC con un record batch cada `batch_size` anuncios"""
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    sink = _Drain()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in _chunks(records, batch_size):
+            writer.write_batch(_record_batch(chunk, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def iter_parquet(
+    records: List[ListingRecord], batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Archivo Parquet con un row group cada `batch_size` anuncios"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in _chunks(records, batch_size):
+            writer.write_table(pa.Table.from_batches([_record_batch(chunk, schema)]))
+            yield sink.take()
+    # El footer se escribe al cerrar
+    yield sink.take()
+
+
+def iter_csv(
+    records: List[ListingRecord], batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RECORD_FIELDS)
+    for chunk in _chunks(records, batch_size):
+        for record in chunk:
+            values = (getattr(record, name) for name in RECORD_FIELDS)
+            writer.writerow(["" if v is None else v for v in values])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_export(
+    records: List[ListingRecord], format: str, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Serializa los anuncios en el formato columnar pedido, por partes"""
+    if format == "arrow":
+        return iter_arrow(records, batch_size)
+    if format == "parquet":
+        return iter_parquet(records, batch_size)
+    if format == "csv":
+        return iter_csv(records, batch_size)
+    raise ValueError(f"Formato de exportación no soportado: {format}")
@@ -0,0 +1,191 @@
+import os
+import re
+import logging
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Locale de los números del sitio: "es" usa coma decimal y punto de miles
+LISTING_LOCALE = os.getenv("LISTING_LOCALE", "es-CO")
+# Moneda que se asume cuando el precio solo trae "$"
+LISTING_DEFAULT_CURRENCY = os.getenv("LISTING_DEFAULT_CURRENCY", "COP")
+
+CURRENCY_SYMBOLS = {
+    "US$": "USD",
+    "U$S": "USD",
+    "€": "EUR",
+    "£": "GBP",
+    "$": LISTING_DEFAULT_CURRENCY,
+}
+CURRENCY_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+NUMBER_RE = re.compile(r"\d[\d.,\s  ]*")
+# Unidades de superficie, su factor a m² y el separador decimal que implican
+# (None = el del locale): los pies cuadrados vienen en notación inglesa
+SURFACE_UNITS = [
+    (re.compile(r"\bha\b|hect", re.I), 10000.0, None),
+    (re.compile(r"ft²|ft2|sq\.?\s*ft", re.I), 0.09290304, "."),
+]
+
+
+def decimal_separator(locale: str = LISTING_LOCALE) -> str:
+    return "." if locale.lower().startswith("en") else ","
+
+
+def parse_number(
+    text: Any, decimal: str = ",", thousands_only: bool = False
+) -> Optional[float]:
+    """
+    Primer número del texto respetando los separadores del locale:
+    "1.200.000" -> 1200000, "1.250,5" -> 1250.5, "2.5" -> 2.5. Con un único
+    separador seguido de tres dígitos se decide por el locale, salvo que
+    `thousands_only` indique que el valor no lleva decimales (precios).
+    """
+    if text is None or isinstance(text, bool):
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = NUMBER_RE.search(str(text))
+    if match is None:
+        return None
+    raw = re.sub(r"[\s  ]", "", match.group(0)).rstrip(".,")
+
+    if "." in raw and "," in raw:
+        decimal = "." if raw.rfind(".") > raw.rfind(",") else ","
+    elif "." in raw or "," in raw:
+        separator = "." if "." in raw else ","
+        groups = raw.split(separator)
+        if len(groups) > 2 or (
+            len(groups[-1]) == 3 and (thousands_only or separator != decimal)
+        ):
+            decimal = ""
+        else:
+            decimal = separator
+    thousands = {".": ",", ",": "."}.get(decimal)
+    if thousands:
+        raw = raw.replace(thousands, "")
+    else:
+        raw = raw.replace(".", "").replace(",", "")
+    if decimal:
+        raw = raw.replace(decimal, ".")
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def parse_price(
+    text: Any, locale: str = LISTING_LOCALE
+) -> Tuple[Optional[str], Optional[int]]:
+    """("COP", 1200000000) a partir de "COP 1.200.000.000"; (None, None) si no hay monto"""
+    if text is None:
+        return None, None
+    amount = parse_number(text, decimal_separator(locale), thousands_only=True)
+    if amount is None:
+        return None, None
+
+    text = str(text)
+    match = CURRENCY_CODE_RE.search(text)
+    currency = match.group(1) if match else None
+    if currency is None:
+        currency = next(
+            (code for symbol, code in CURRENCY_SYMBOLS.items() if symbol in text), None
+        )
+    return currency, int(round(amount))
+
+
+def parse_count(text: Any) -> Optional[int]:
+    """3 a partir de "3 Habitaciones" o "3+"; None si no es entero ("1.5 baños")"""
+    value = parse_number(text, ",")
+    if value is None or not value.is_integer():
+        return None
+    return int(value)
+
+
+def parse_surface(text: Any, locale: str = LISTING_LOCALE) -> Optional[float]:
+    """Superficie en m² ("1.250,5 m²", "2 ha", "1,000 ft²", 95)"""
+    if not isinstance(text, str):
+        return parse_number(text)
+    for pattern, factor, decimal in SURFACE_UNITS:
+        if pattern.search(text):
+            value = parse_number(text, decimal or decimal_separator(locale))
+            return value * factor if value is not None else None
+    return parse_number(text, decimal_separator(locale))
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+@dataclass(slots=True)
+class ListingRecord:
+    """Anuncio con los valores ya tipados; ocupa menos que el dict de strings"""
+
+    url: Optional[str] = None
+    id: Optional[str] = None
+    headline: Optional[str] = None
+    location: Optional[str] = None
+    price_currency: Optional[str] = None
+    price_amount: Optional[int] = None
+    price_raw: Optional[str] = None
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    living_surface: Optional[float] = None
+    plot_surface: Optional[float] = None
+    total_surface: Optional[float] = None
+    construction_year: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    description: Optional[str] = None
+    agent: Optional[str] = None
+    change: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+RECORD_FIELDS = [f.name for f in fields(ListingRecord)]
+
+
+def parse_listings(
+    listings: List[Dict[str, Any]], locale: str = LISTING_LOCALE
+) -> List[ListingRecord]:
+    """Convierte un lote de anuncios (dicts de strings) en ListingRecord"""
+    records = []
+    for item in listings:
+        currency, amount = parse_price(item.get("price"), locale)
+        year = parse_number(item.get("construction_year"))
+        records.append(
+            ListingRecord(
+                url=_to_str(item.get("url")),
+                id=_to_str(item.get("id")),
+                headline=_to_str(item.get("headline")),
+                location=_to_str(item.get("location")),
+                price_currency=currency,
+                price_amount=amount,
+                price_raw=_to_str(item.get("price")),
+                bedrooms=parse_count(item.get("bedrooms")),
+                bathrooms=parse_count(item.get("bathrooms")),
+                living_surface=parse_surface(item.get("living_surface"), locale),
+                plot_surface=parse_surface(item.get("plot_surface"), locale),
+                total_surface=parse_surface(item.get("total_surface"), locale),
+                construction_year=int(year) if year is not None else None,
+                latitude=_to_float(item.get("latitude")),
+                longitude=_to_float(item.get("longitude")),
+                description=_to_str(item.get("description")),
+                agent=_to_str(item.get("agent")),
+                change=_to_str(item.get("change")),
+            )
+        )
+    return records
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DATA_DIR = os.getenv("DATA_DIR", ".")
+LISTING_DB_PATH = os.getenv(
+    "LISTING_DB_PATH", os.path.join(DATA_DIR, "listings.sqlite3")
+)
+
+# Cada cuánto (segundos) una corrida delta recorre la búsqueda completa para
+# detectar anuncios retirados; 0 recorre todo en cada corrida
+DELTA_FULL_WALK_INTERVAL = float(os.getenv("DELTA_FULL_WALK_INTERVAL", str(24 * 3600)))
+
+# Campos de la card que determinan si un anuncio cambió
+TRACKED_FIELDS = ("price", "location", "headline", "bedrooms", "bathrooms")
+
+
+class ListingStore:
+    """
+    Almacén persistente de anuncios en SQLite, indexado por URL. Guarda la
+    primera y última vez que se vio cada anuncio, su historial de precios y
+    en qué búsquedas aparece.
+    """
+
+    def __init__(self, db_path: str = LISTING_DB_PATH):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        # Varios procesos worker escriben el mismo fichero: WAL permite leer
+        # mientras otro escribe y el timeout espera al bloqueo en vez de fallar
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS listings (
+                url TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                price TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS price_history (
+                url TEXT NOT NULL,
+                price TEXT,
+                seen_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS price_history_url ON price_history (url);
+            CREATE TABLE IF NOT EXISTS search_listings (
+                search_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                removed_at REAL,
+                PRIMARY KEY (search_key, url)
+            );
+            CREATE TABLE IF NOT EXISTS search_walks (
+                search_key TEXT PRIMARY KEY,
+                completed_at REAL NOT NULL
+            );
+            """
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def record(
+        self, search_key: str, property_data: Dict[str, Any], seen_at: float
+    ) -> str:
+        """
+        Registra el anuncio visto en una búsqueda y devuelve si es "new",
+        "changed" o "unchanged" respecto a lo almacenado.
+        """
+        url = property_data.get("url")
+        if not url:
+            return "new"
+
+        row = self._db.execute(
+            "SELECT data, price FROM listings WHERE url = ?", (url,)
+        ).fetchone()
+        data = json.dumps(property_data, ensure_ascii=False)
+        price = property_data.get("price")
+
+        if row is None:
+            status = "new"
+            self._db.execute(
+                "INSERT INTO listings (url, data, price, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, data, price, seen_at, seen_at),
+            )
+            self._db.execute(
+                "INSERT INTO price_history (url, price, seen_at) VALUES (?, ?, ?)",
+                (url, price, seen_at),
+            )
+        else:
+            stored = json.loads(row["data"])
+            changed = any(
+                stored.get(field) != property_data.get(field)
+                for field in TRACKED_FIELDS
+            )
+            status = "changed" if changed else "unchanged"
+            self._db.execute(
+                "UPDATE listings SET data = ?, price = ?, last_seen = ? WHERE url = ?",
+                (data, price, seen_at, url),
+            )
+            if row["price"] != price:
+                self._db.execute(
+                    "INSERT INTO price_history (url, price, seen_at) VALUES (?, ?, ?)",
+                    (url, price, seen_at),
+                )
+
+        previous = self._db.execute(
+            "SELECT removed_at FROM search_listings WHERE search_key = ? AND url = ?",
+            (search_key, url),
+        ).fetchone()
+        if previous is not None and previous["removed_at"] is not None:
+            # Reapareció en la búsqueda después de haberse dado por retirado
+            status = "new"
+        self._db.execute(
+            "INSERT INTO search_listings (search_key, url, last_seen, removed_at) "
+            "VALUES (?, ?, ?, NULL) ON CONFLICT (search_key, url) "
+            "DO UPDATE SET last_seen = excluded.last_seen, removed_at = NULL",
+            (search_key, url, seen_at),
+        )
+        self._db.commit()
+        return status
+
+    def mark_removed(self, search_key: str, run_started: float) -> List[Dict[str, Any]]:
+        """
+        Marca como retirados los anuncios de la búsqueda que no se vieron desde
+        `run_started` y los devuelve. Solo tiene sentido tras un recorrido
+        completo de la búsqueda.
+        """
+        rows = self._db.execute(
+            "SELECT l.data FROM search_listings s JOIN listings l ON l.url = s.url "
+            "WHERE s.search_key = ? AND s.last_seen < ? AND s.removed_at IS NULL",
+            (search_key, run_started),
+        ).fetchall()
+        self._db.execute(
+            "UPDATE search_listings SET removed_at = ? "
+            "WHERE search_key = ? AND last_seen < ? AND removed_at IS NULL",
+            (time.time(), search_key, run_started),
+        )
+        self._db.commit()
+        return [json.loads(row["data"]) for row in rows]
+
+    def needs_full_walk(
+        self, search_key: str, interval: float = DELTA_FULL_WALK_INTERVAL
+    ) -> bool:
+        """Indica si pasó `interval` desde el último recorrido completo"""
+        row = self._db.execute(
+            "SELECT completed_at FROM search_walks WHERE search_key = ?",
+            (search_key,),
+        ).fetchone()
+        return row is None or time.time() - row["completed_at"] >= interval
+
+    def record_full_walk(self, search_key: str, completed_at: float):
+        self._db.execute(
+            "INSERT INTO search_walks (search_key, completed_at) VALUES (?, ?) "
+            "ON CONFLICT (search_key) DO UPDATE SET completed_at = excluded.completed_at",
+            (search_key, completed_at),
+        )
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el anuncio con sus fechas e historial de precios"""
+        row = self._db.execute(
+            "SELECT * FROM listings WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        history = self._db.execute(
+            "SELECT price, seen_at FROM price_history WHERE url = ? ORDER BY seen_at",
+            (url,),
+        ).fetchall()
+        return {
+            "data": json.loads(row["data"]),
+            "first_seen": row["first_seen"],
+            "last_seen": row["last_seen"],
+            "price_history": [dict(h) for h in history],
+        }
@@ -0,0 +1,138 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import unicodedata
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from metrics import LOCATION_CACHE
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DATA_DIR = os.getenv("DATA_DIR", ".")
+# Base SQLite con las ubicaciones ya resueltas por el sitio; vacío la desactiva
+LOCATION_CACHE_PATH = (
+    os.getenv("LOCATION_CACHE_PATH", os.path.join(DATA_DIR, "locations.sqlite3"))
+    or None
+)
+# Tiempo que se confía en una resolución antes de volver a pasar por el buscador
+LOCATION_CACHE_TTL = float(os.getenv("LOCATION_CACHE_TTL", str(30 * 24 * 3600)))
+
+
+def normalize_location(location: str) -> str:
+    """
+    Clave de la caché: sin tildes, en minúsculas y con los espacios
+    colapsados, para que "Medellín" y " medellin " sean la misma entrada.
+    """
+    text = unicodedata.normalize("NFKD", location or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\s*,\s*", ", ", text.casefold())
+    return re.sub(r"\s+", " ", text).strip(" ,")
+
+
+class LocationCache:
+    """
+    Recuerda la URL de resultados que produjo el autocompletado del sitio
+    para cada ubicación, así las búsquedas siguientes van directo a ella sin
+    pasar por el buscador de la página inicial.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = LOCATION_CACHE_PATH,
+        ttl: float = LOCATION_CACHE_TTL,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+            # Compartida entre workers: WAL para no bloquear las lecturas
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.row_factory = sqlite3.Row
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS locations (
+                    key TEXT PRIMARY KEY,
+                    location TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    resolved_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, location: str) -> Optional[str]:
+        """URL de resultados resuelta para la ubicación, o None si no hay o expiró"""
+        if self._db is None:
+            return None
+        key = normalize_location(location)
+        row = self._db.execute(
+            "SELECT target, resolved_at FROM locations WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            LOCATION_CACHE.labels(outcome="miss").inc()
+            return None
+        if time.time() - row["resolved_at"] > self.ttl:
+            LOCATION_CACHE.labels(outcome="expired").inc()
+            self._delete(key)
+            return None
+
+        LOCATION_CACHE.labels(outcome="hit").inc()
+        self._db.execute("UPDATE locations SET hits = hits + 1 WHERE key = ?", (key,))
+        self._db.commit()
+        return row["target"]
+
+    def set(self, location: str, target: str):
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT INTO locations (key, location, target, resolved_at, hits) "
+            "VALUES (?, ?, ?, ?, 0) ON CONFLICT (key) DO UPDATE SET "
+            "location = excluded.location, target = excluded.target, "
+            "resolved_at = excluded.resolved_at, hits = 0",
+            (normalize_location(location), location, target, time.time()),
+        )
+        self._db.commit()
+        logger.info(f"Ubicación '{location}' resuelta a {target}")
+
+    def invalidate(self, location: str):
+        """Descarta la entrada cuando su URL deja de devolver resultados"""
+        if self._db is None:
+            return
+        if self._delete(normalize_location(location)):
+            LOCATION_CACHE.labels(outcome="invalidated").inc()
+            logger.info(f"Ubicación '{location}' eliminada de la caché")
+
+    def clear(self):
+        if self._db is None:
+            return
+        self._db.execute("DELETE FROM locations")
+        self._db.commit()
+
+    def _delete(self, key: str) -> bool:
+        cursor = self._db.execute("DELETE FROM locations WHERE key = ?", (key,))
+        self._db.commit()
+        return cursor.rowcount > 0
+
+    def stats(self) -> Dict[str, Any]:
+        if self._db is None:
+            return {"entries": 0, "hits": 0}
+        row = self._db.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM locations"
+        ).fetchone()
+        return {"entries": row["entries"], "hits": row["hits"]}
+
+
+location_cache = LocationCache()
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import uuid
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Con varios procesos worker, prometheus_client escribe los valores en este
+# directorio y /metrics los agrega
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def mark_process_dead(pid: int):
+    """Descarta los gauges "live" de un proceso worker que terminó"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+# Si se define, cada span se escribe como una línea JSON estilo OpenTelemetry
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH") or None
+
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+PHASE_SECONDS = Histogram(
+    "scraper_phase_seconds",
+    "Duración de cada fase del scraper",
+    ["phase"],
+    buckets=PHASE_BUCKETS,
+)
+PHASE_ERRORS = Counter(
+    "scraper_phase_errors_total", "Fases terminadas con excepción", ["phase"]
+)
+CARDS = Counter(
+    "scraper_cards_total",
+    "Cards procesadas por resultado (seen, accepted, rejected)",
+    ["outcome"],
+)
+INTERCEPTED_REQUESTS = Counter(
+    "scraper_intercepted_requests_total",
+    "Peticiones del navegador por resultado (blocked, cached, fetched)",
+    ["outcome"],
+)
+INTERCEPTED_BYTES = Counter(
+    "scraper_intercepted_bytes_total",
+    "Bytes servidos desde la caché de assets o descargados",
+    ["outcome"],
+)
+FETCH_PATH = Counter(
+    "scraper_fetch_path_total",
+    "Búsquedas por vía de obtención (http, fallback al navegador, browser)",
+    ["path"],
+)
+LOCATION_CACHE = Counter(
+    "scraper_location_cache_total",
+    "Consultas a la caché de ubicaciones (hit, miss, expired, invalidated)",
+    ["outcome"],
+)
+BROWSER_RECYCLES = Counter(
+    "scraper_browser_recycles_total",
+    "Navegadores reciclados por motivo (contexts, memory, hung, crashed)",
+    ["reason"],
+)
+BROWSER_RSS = Gauge(
+    "scraper_browser_rss_bytes",
+    "RSS del proceso del navegador y sus renderers",
+    ["browser"],
+    multiprocess_mode="liveall",
+)
+SELECTOR_WINS = Counter(
+    "scraper_selector_wins_total",
+    "Estrategia de selector que encontró primero cada elemento",
+    ["target", "strategy"],
+)
+
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = (
+    contextvars.ContextVar("current_span", default=None)
+)
+_export_lock = threading.Lock()
+
+
+def _export(record: Dict[str, Any]):
+    try:
+        with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    except Exception as e:
+        logger.warning(f"No se pudo exportar el span {record['name']}: {str(e)}")
+
+
+@contextmanager
+def span(phase: str, **attributes):
+    """
+    Mide una fase: la registra en el histograma scraper_phase_seconds y, si
+    TRACE_EXPORT_PATH está definido, exporta el span con su padre.
+    """
+    parent = _current_span.get()
+    current = {
+        "traceId": parent["traceId"] if parent else uuid.uuid4().hex,
+        "spanId": uuid.uuid4().hex[:16],
+        "parentSpanId": parent["spanId"] if parent else None,
+    }
+    token = _current_span.set(current)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    status = "OK"
+    try:
+        yield current
+    except BaseException:
+        status = "ERROR"
+        PHASE_ERRORS.labels(phase=phase).inc()
+        raise
+    finally:
+        PHASE_SECONDS.labels(phase=phase).observe(time.perf_counter() - start)
+        _current_span.reset(token)
+        if TRACE_EXPORT_PATH:
+            _export(
+                {
+                    **current,
+                    "name": phase,
+                    "startTimeUnixNano": start_ns,
+                    "endTimeUnixNano": time.time_ns(),
+                    "attributes": attributes,
+                    "status": status,
+                }
+            )
+
+
+def timed(phase: str):
+    """Decorador para medir una corrutina completa como una fase"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(phase):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,94 @@
+import os
+import logging
+from dataclasses import dataclass
+from typing import Dict
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DEFAULT_PACING = os.getenv("DEFAULT_PACING", "default")
+
+# Tiempo máximo para que el DOM deje de mutar tras una acción
+DOM_SETTLE_TIMEOUT = int(os.getenv("DOM_SETTLE_TIMEOUT", "5000"))
+
+
+@dataclass(frozen=True)
+class PacingProfile:
+    """
+    Pausas deliberadas del flujo tipeado, en milisegundos. No reemplazan las
+    esperas de carga: solo agregan ritmo humano encima de ellas.
+    """
+
+    name: str
+    # Entre el hover y el click
+    action_delay: int
+    # Entre tecla y tecla
+    typing_delay: int
+    # Antes de los pasos grandes (abrir y enviar filtros)
+    think_time: int
+    # Silencio del DOM que se considera "estable"
+    settle_quiet: int
+
+
+PACING_PROFILES: Dict[str, PacingProfile] = {
+    "fast": PacingProfile(
+        "fast", action_delay=0, typing_delay=0, think_time=0, settle_quiet=100
+    ),
+    "default": PacingProfile(
+        "default", action_delay=50, typing_delay=20, think_time=0, settle_quiet=200
+    ),
+    "stealth": PacingProfile(
+        "stealth", action_delay=200, typing_delay=50, think_time=1000, settle_quiet=300
+    ),
+}
+
+# Resuelve cuando pasan `quiet` ms sin mutaciones o se agota `timeout`
+DOM_SETTLED_JS = """
+([quiet, timeout]) => new Promise((resolve) => {
+    let timer = null;
+    const done = (settled) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(limit);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => done(true), quiet);
+    });
+    observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, characterData: true,
+    });
+    timer = setTimeout(() => done(true), quiet);
+    const limit = setTimeout(() => done(false), timeout);
+})
+"""
+
+
+def get_pacing(name: str) -> PacingProfile:
+    if name not in PACING_PROFILES:
+        raise ValueError(f"Perfil de ritmo no soportado: {name}")
+    return PACING_PROFILES[name]
+
+
+async def pause(page, ms: int):
+    """Pausa deliberada del perfil; no hace nada si es 0"""
+    if ms > 0:
+        await page.wait_for_timeout(ms)
+
+
+async def wait_for_dom_settled(
+    page, quiet: int = 200, timeout: int = DOM_SETTLE_TIMEOUT
+) -> bool:
+    """Espera a que el DOM pase `quiet` ms sin cambios. Devuelve False si no se calmó"""
+    try:
+        settled = await page.evaluate(DOM_SETTLED_JS, [quiet, timeout])
+    except Exception as e:
+        logger.debug(f"No se pudo observar el DOM: {str(e)}")
+        return False
+    if not settled:
+        logger.info(f"El DOM siguió cambiando tras {timeout} ms")
+    return settled
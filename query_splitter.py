@@ -0,0 +1,174 @@
+import os
+import re
+import math
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Resultados que el sitio deja recorrer por búsqueda; por encima se divide
+SPLIT_RESULT_CAP = int(os.getenv("SPLIT_RESULT_CAP", "1000"))
+SPLIT_MAX_DEPTH = int(os.getenv("SPLIT_MAX_DEPTH", "8"))
+# Conteos y sub-búsquedas que corren a la vez
+SPLIT_CONCURRENCY = int(os.getenv("SPLIT_CONCURRENCY", "3"))
+
+# Filtros por los que se divide, en orden, con el rango que se asume cuando
+# la búsqueda no los acota
+SPLIT_DIMENSIONS: List[Tuple[str, str, int, int]] = [
+    ("price_min", "price_max", 0, int(os.getenv("SPLIT_PRICE_CEILING", str(10**11)))),
+    ("living_surface_min", "living_surface_max", 0, 100000),
+    ("rooms_min", "rooms_max", 0, 50),
+]
+
+Filters = Dict[str, Optional[str]]
+
+
+# Formatos aceptados en los filtros que se dividen: "500000000",
+# "500.000.000" o "500,000,000", con "$" opcional
+INTEGER_FILTER_RE = re.compile(r"^\$?\s*(\d+|\d{1,3}(?:\.\d{3})+|\d{1,3}(?:,\d{3})+)$")
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    if value is None or not str(value).strip():
+        return None
+    match = INTEGER_FILTER_RE.match(str(value).strip())
+    if match is None:
+        # "1.5" no es 15: mejor rechazar que dividir un rango equivocado
+        raise ValueError(f"Valor de filtro no entero: {value!r}")
+    return int(re.sub(r"[.,]", "", match.group(1)))
+
+
+def split_range(
+    filters: Filters, dimension: Tuple[str, str, int, int]
+) -> Optional[Tuple[Filters, Filters]]:
+    """
+    Divide el rango de la dimensión en dos mitades disjuntas. Se usa el punto
+    medio geométrico porque precios y superficies se concentran en la parte
+    baja del rango. Devuelve None si el rango ya no se puede dividir.
+    """
+    min_key, max_key, floor, ceiling = dimension
+    low = _to_int(filters.get(min_key))
+    high = _to_int(filters.get(max_key))
+    low = floor if low is None else low
+    high = ceiling if high is None else high
+    if high - low < 1:
+        return None
+
+    middle = int(math.sqrt(max(low, 1) * high))
+    middle = min(max(middle, low), high - 1)
+    left = {**filters, min_key: str(low), max_key: str(middle)}
+    right = {**filters, min_key: str(middle + 1), max_key: str(high)}
+    # Los extremos que la búsqueda original no tenía quedan abiertos
+    if filters.get(min_key) is None and low == floor:
+        left[min_key] = None
+    if filters.get(max_key) is None and high == ceiling:
+        right[max_key] = None
+    return left, right
+
+
+async def plan_partitions(
+    count: Callable[[Filters], Awaitable[Optional[int]]],
+    filters: Filters,
+    cap: int = SPLIT_RESULT_CAP,
+    max_depth: int = SPLIT_MAX_DEPTH,
+    concurrency: int = SPLIT_CONCURRENCY,
+) -> List[Filters]:
+    """
+    Divide la búsqueda recursivamente hasta que cada parte tenga a lo sumo
+    `cap` resultados según `count`. Las partes son disjuntas y cubren todos
+    los resultados contados: una mitad vacía se descarta y la otra sigue
+    dividiéndose sin gastar profundidad (así el rango abierto de precios se
+    ajusta a donde están los anuncios). Si un corte no baja el conteo se
+    prueba con la siguiente dimensión.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def counted(part: Filters) -> Optional[int]:
+        async with semaphore:
+            return await count(part)
+
+    async def plan(part: Filters, depth: int, total: Optional[int]) -> List[Filters]:
+        if total is None or total <= cap:
+            return [part]
+        if depth >= max_depth:
+            logger.warning(f"Profundidad máxima de división con {total} resultados")
+            return [part]
+
+        for dimension in SPLIT_DIMENSIONS:
+            halves = split_range(part, dimension)
+            if halves is None:
+                continue
+            totals = await asyncio.gather(*(counted(h) for h in halves))
+            name = dimension[0][:-4]
+            if None not in totals and 0 in totals:
+                # Todo quedó de un lado: se ajusta el rango y se vuelve a cortar
+                half, half_total = max(zip(halves, totals), key=lambda p: p[1])
+                return await plan(half, depth, half_total)
+            if None not in totals and max(totals) >= total:
+                logger.info(f"Dividir por {name} no bajó {total} resultados")
+                continue
+            logger.info(f"Dividiendo {total} resultados por {name}")
+            results = await asyncio.gather(
+                *(plan(h, depth + 1, t) for h, t in zip(halves, totals))
+            )
+            return [p for parts in results for p in parts]
+
+        logger.warning(f"No se puede dividir más una búsqueda con {total} resultados")
+        return [part]
+
+    partitions = await plan(filters, 0, await counted(filters))
+    logger.info(f"Búsqueda dividida en {len(partitions)} partes")
+    return partitions
+
+
+async def iter_merged(
+    factories: List[Callable[[], AsyncIterator[Dict[str, Any]]]],
+    concurrency: int = SPLIT_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ejecuta los generadores con concurrencia acotada y entrega sus elementos
+    a medida que llegan. Un error en cualquiera detiene el resto.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(factory):
+        try:
+            async with semaphore:
+                async with aclosing(factory()) as items:
+                    async for item in items:
+                        await queue.put(("item", item))
+            await queue.put(("done", None))
+        except Exception as e:
+            await queue.put(("error", e))
+
+    tasks = [asyncio.create_task(pump(factory)) for factory in factories]
+    try:
+        pending = len(tasks)
+        while pending:
+            kind, payload = await queue.get()
+            if kind == "item":
+                yield payload
+            elif kind == "error":
+                raise payload
+            else:
+                pending -= 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or None
+
+_THOUSANDS_RE = re.compile(r"^\d{1,3}([.,]\d{3})+$")
+
+
+def _canonical_number(value: str) -> Optional[str]:
+    """Devuelve el número en forma canónica ("1.200.000" -> "1200000") o None"""
+    compact = re.sub(r"\s+", "", value)
+    if _THOUSANDS_RE.match(compact):
+        compact = re.sub(r"[.,]", "", compact)
+    compact = compact.replace(",", ".")
+    try:
+        number = Decimal(compact)
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    if number == number.to_integral_value():
+        return str(int(number))
+    return format(number.normalize(), "f")
+
+
+def normalize_request(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Forma normalizada de una petición: se descartan los None, los textos se
+    recortan y pasan a minúsculas y los filtros numéricos se canonicalizan.
+    """
+    normalized = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+            number = _canonical_number(value) if key != "location" else None
+            value = number if number is not None else value.casefold()
+        normalized[key] = value
+    return normalized
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    return json.dumps(normalize_request(params), sort_keys=True, ensure_ascii=False)
+
+
+class ResultCache:
+    """
+    Caché LRU con TTL para resultados de scraping, con persistencia opcional en
+    disco. Las peticiones idénticas en curso comparten un solo scrape.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_CACHE_TTL,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        directory: Optional[str] = RESULT_CACHE_DIR,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "in_flight": len(self._inflight),
+        }
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, size, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return True, value
+            self._remove(key)
+
+        if self.directory:
+            return self._load(key)
+        return False, None
+
+    def _load(self, key: str) -> Tuple[bool, Any]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            logger.warning(f"Entrada de caché ilegible {path}: {str(e)}")
+            return False, None
+
+        if stored.get("key") != key or stored.get("expires_at", 0) <= time.time():
+            self._discard_file(key)
+            return False, None
+        self._store(key, stored["value"], stored["expires_at"])
+        return True, stored["value"]
+
+    def _discard_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+
+        # Expulsar las entradas menos usadas hasta respetar los límites
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def get(self, key: str) -> Optional[Any]:
+        found, value = self._lookup(key)
+        return value if found else None
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        if self.directory:
+            try:
+                with open(self._path(key), "w", encoding="utf-8") as f:
+                    json.dump(
+                        {"key": key, "expires_at": expires_at, "value": value},
+                        f,
+                        ensure_ascii=False,
+                        default=str,
+                    )
+            except Exception as e:
+                logger.warning(f"No se pudo persistir la entrada de caché: {str(e)}")
+
+    def invalidate(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+        if self.directory:
+            self._discard_file(key)
+
+    async def get_or_compute(self, key: str, factory: Callable[[], Awaitable[Any]]):
+        """
+        Devuelve el valor en caché o lo calcula una sola vez aunque lleguen
+        varias peticiones idénticas al mismo tiempo.
+        """
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await self._wait(key, task)
+
+        self.misses += 1
+        task = asyncio.create_task(factory())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Task):
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None:
+                self.set(key, t.result())
+
+        task.add_done_callback(_done)
+        return await self._wait(key, task)
+
+    async def _wait(self, key: str, task: asyncio.Task):
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Si nadie más espera el resultado, se cancela el cálculo
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
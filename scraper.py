@@ -2,10 +2,81 @@ import os
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright
 import asyncio
-from typing import Optional, List, Dict, Any
+import math
+import re
+import functools
+import time
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
 from datetime import datetime
 import logging
 
+from api_capture import (
+    SEARCH_API_GRACE,
+    SEARCH_API_TIMEOUT,
+    SearchApiCapture,
+    find_filter_state,
+    find_listings,
+    is_search_api_response,
+    parse_api_listing,
+)
+from browser_pool import (
+    DEFAULT_TIMEOUT,
+    BrowserPool,
+    launch_browser,
+    new_scraper_context,
+)
+from deadline import (
+    DeadlineExceeded,
+    apply_budget,
+    budget_ms,
+    collect,
+    deadline_after,
+    iter_until,
+    remaining,
+    within,
+)
+from detail_enricher import iter_enriched
+from http_fetcher import (
+    FastPathUnavailable,
+    extract_hydration_payloads,
+    fetch_search_page,
+    iter_search_pages,
+)
+from har_replay import (
+    HAR_MODES,
+    HAR_REPLAY_LATENCY,
+    HarReplayer,
+    har_paths,
+    load_results,
+    save_results,
+)
+from interceptor import interceptor_for
+from listing_record import (
+    ListingRecord,
+    parse_count,
+    parse_listings,
+    parse_number,
+    parse_price,
+    parse_surface,
+)
+from listing_store import ListingStore
+from location_cache import LocationCache, location_cache
+from metrics import CARDS, FETCH_PATH, span, timed
+from pacing import (
+    DEFAULT_PACING,
+    PACING_PROFILES,
+    PacingProfile,
+    get_pacing,
+    pause,
+    wait_for_dom_settled,
+)
+from query_splitter import iter_merged, plan_partitions
+from result_cache import cache_key
+from selector_registry import SELECTOR_TIMEOUT, selector_registry
+from storage_state import StorageStateStore, storage_state_store
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -14,69 +85,142 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-INITIAL_URL = "https://www.engelvoelkers.com/co/es"
+INITIAL_URL = os.getenv("INITIAL_URL", "https://www.engelvoelkers.com/co/es")
+
+# Página de resultados a la que se navega directamente en el modo "url"
+SEARCH_URL = os.getenv("SEARCH_URL", f"{INITIAL_URL}/search/")
+SEARCH_URL_TIMEOUT = int(os.getenv("SEARCH_URL_TIMEOUT", "15000"))
+
+# Tiempo que se espera a que aparezca el banner de cookies (ms) y cookie que
+# indica que el consentimiento ya está dado
+COOKIE_BANNER_TIMEOUT = int(os.getenv("COOKIE_BANNER_TIMEOUT", "3000"))
+CONSENT_COOKIE = "didomi_token"
+
+NAVIGATION_MODES = ("url", "ui")
+
+# "http" lee los anuncios embebidos en el HTML sin navegador y recurre a
+# Playwright solo si la página es un desafío o no trae los datos
+FETCH_MODES = ("http", "browser")
+
+FILTER_FIELDS = (
+    "property_type",
+    "property_subtype",
+    "price_min",
+    "price_max",
+    "living_surface_min",
+    "living_surface_max",
+    "plot_surface_min",
+    "plot_surface_max",
+    "total_surface_min",
+    "total_surface_max",
+    "rooms_min",
+    "rooms_max",
+    "bedrooms_min",
+    "bedrooms_max",
+    "bathrooms_min",
+    "bathrooms_max",
+    "construction_year_min",
+    "construction_year_max",
+)
+
+# Nombre del parámetro de query de cada campo de la búsqueda
+SEARCH_QUERY_PARAMS = {
+    "location": "q",
+    "property_type": "propertyType",
+    "property_subtype": "propertySubType",
+    "price_min": "priceMin",
+    "price_max": "priceMax",
+    "living_surface_min": "livingSurfaceMin",
+    "living_surface_max": "livingSurfaceMax",
+    "plot_surface_min": "plotSurfaceMin",
+    "plot_surface_max": "plotSurfaceMax",
+    "total_surface_min": "totalSurfaceMin",
+    "total_surface_max": "totalSurfaceMax",
+    "rooms_min": "roomsMin",
+    "rooms_max": "roomsMax",
+    "bedrooms_min": "bedroomsMin",
+    "bedrooms_max": "bedroomsMax",
+    "bathrooms_min": "bathroomsMin",
+    "bathrooms_max": "bathroomsMax",
+    "construction_year_min": "constructionYearMin",
+    "construction_year_max": "constructionYearMax",
+}
+
+# Número de pestañas de resultados que se cargan en paralelo por petición
+PAGE_CONCURRENCY = int(os.getenv("PAGE_CONCURRENCY", "3"))
+
+
+FILTERS_SUBMIT_SELECTOR = (
+    "[data-test-id='search-components_advanced-filters_submit-button']"
+)
+# Tiempo máximo para que una acción de búsqueda produzca respuesta de la API
+SEARCH_RESPONSE_TIMEOUT = int(os.getenv("SEARCH_RESPONSE_TIMEOUT", "15000"))
+
+
+async def click_and_wait_for_search_api(
+    page, locator, timeout: int = SEARCH_RESPONSE_TIMEOUT
+) -> bool:
+    """
+    Hace click y espera la respuesta de la API de búsqueda que provoca.
+    Devuelve False si no llega a tiempo (p. ej. el sitio renderiza en servidor).
+    """
+    response = asyncio.ensure_future(
+        page.wait_for_response(is_search_api_response, timeout=timeout)
+    )
+    try:
+        await locator.click()
+    except BaseException:
+        response.cancel()
+        raise
+    try:
+        await response
+        return True
+    except Exception:
+        logger.info("La acción no produjo una respuesta de la API de búsqueda")
+        return False
 
 
 # Clase para manejar los filtros de propiedades
 class FilterManager:
-    def __init__(self, page):
+    def __init__(
+        self,
+        page,
+        pacing: PacingProfile = PACING_PROFILES[DEFAULT_PACING],
+        deadline: Optional[float] = None,
+        capture: Optional[SearchApiCapture] = None,
+    ):
         self.page = page
-
+        self.pacing = pacing
+        # Instante límite de la petición; cada paso usa solo lo que queda
+        self.deadline = deadline
+        # Captura de la API a vaciar antes de enviar los filtros
+        self.capture = capture
+
+    async def _click(self, locator):
+        """Hover y click con la pausa del perfil entre ambos"""
+        await locator.hover()
+        await pause(self.page, self.pacing.action_delay)
+        await locator.click()
+
+    @timed("open_filters")
     async def open_filters(self):
         """Abre la sección de filtros si no está abierta"""
-        try:
-            # Simular movimiento del mouse aleatorio antes de buscar filtros
-
-            await self.page.wait_for_timeout(1000)
-
-            # Intento 1: Por el data-test-id específico
-            filter_button = self.page.locator(
-                ".sc-abdb55db-0.fBcWGp.sc-d6722799-14.gCmxhq"
-            )
-
-            await filter_button.wait_for(state="visible")
-            await filter_button.hover()
-            await self.page.wait_for_timeout(200)
-            await filter_button.click()
-            logger.info("Filters opened")
-        except:
-            logger.info("Filters not found, trying to find them in different ways")
-            try:
-
-                await self.page.wait_for_timeout(1000)
-
-                # Intento 2: Por el span dentro del botón
-                filter_button = self.page.locator(
-                    "button span:has-text('Filtros')"
-                ).first
-                await filter_button.wait_for(state="visible")
-                await filter_button.hover()
-                await self.page.wait_for_timeout(200)
-                await filter_button.click()
-                logger.info("Filters opened")
-            except:
-                logger.info("Filters not found, trying to find them in different ways")
-
-                await self.page.wait_for_timeout(1000)
-
-                filter_button = (
-                    self.page.get_by_role("button", name="Filtros")
-                    .filter(has_text="Filtros")
-                    .filter(
-                        has_attribute="data-test-id",
-                        attribute_value="search-components_filter-bar_advanced-filters-button",
-                    )
-                )
-                await filter_button.wait_for(state="visible")
-                await filter_button.hover()
-                await self.page.wait_for_timeout(200)
-                await filter_button.click()
-                logger.info("Filters opened")
+        await pause(self.page, self.pacing.think_time)
+        apply_budget(self.page, self.deadline, DEFAULT_TIMEOUT)
+
+        # Las estrategias de localización compiten en paralelo
+        filter_button = await selector_registry.find(
+            self.page,
+            "filters_button",
+            timeout=budget_ms(self.deadline, SELECTOR_TIMEOUT),
+        )
+        await self._click(filter_button)
+        logger.info("Filters opened")
 
-        # Esperar a que la página se estabilice después de abrir filtros
-        await self.page.wait_for_timeout(2000)
-        await self.page.wait_for_load_state("networkidle")
+        # El panel está listo cuando se ve su botón de envío
+        await self.page.locator(FILTERS_SUBMIT_SELECTOR).wait_for(state="visible")
 
+    @timed("apply_filters")
     async def apply_filters(
         self,
         property_type: Optional[str] = None,
@@ -118,8 +262,6 @@ class FilterManager:
         # Abrir sección de filtros con comportamiento humano
         await self.open_filters()
 
-        await self.page.wait_for_timeout(200)
-
         # Aplicar cada filtro con comportamiento humano
         for key, value in {
             "property_type": property_type,
@@ -142,117 +284,103 @@ class FilterManager:
             "construction_year_max": construction_year_max,
         }.items():
             if value is not None:
+                apply_budget(self.page, self.deadline, DEFAULT_TIMEOUT)
                 try:
-                    # Simular movimiento del mouse antes de cada filtro
-
-                    await self.page.wait_for_timeout(200)
-
                     if key == "property_type":
                         dropdown = self.page.locator(
                             "[data-test-id='search-components_advanced-filters_property-type-filter_button']"
                         )
                         await dropdown.wait_for(state="visible")
-                        await dropdown.hover()
-                        await self.page.wait_for_timeout(200)
-                        await dropdown.click()
-
-                        # Escribir el valor letra por letra
-                        for char in value:
-                            await self.page.keyboard.type(char, delay=50)
-                        await self.page.wait_for_timeout(200)
-                        await self.page.keyboard.press("Enter")
-                        await self.page.wait_for_timeout(200)
+                        await self._click(dropdown)
+                        await self._choose_option(value)
 
                     elif key == "property_subtype":
                         dropdown = self.page.locator(
                             "[data-test-id='search-components_advanced-filters_property-sub-type-filter_button']"
                         )
                         await dropdown.wait_for(state="visible")
-                        await dropdown.hover()
-                        await self.page.wait_for_timeout(200)
-                        await dropdown.click()
-
-                        # Escribir el valor letra por letra
-                        for char in value:
-                            await self.page.keyboard.type(char, delay=50)
-                        await self.page.wait_for_timeout(200)
-                        await self.page.keyboard.press("Enter")
-                        await self.page.wait_for_timeout(200)
+                        await self._click(dropdown)
+                        await self._choose_option(value)
 
                     elif key in ["price_min", "price_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_price-filter_input-{'min' if key == 'price_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["living_surface_min", "living_surface_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_living-surface-filter_input-{'min' if key == 'living_surface_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["plot_surface_min", "plot_surface_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_plot-surface-filter_input-{'min' if key == 'plot_surface_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["total_surface_min", "total_surface_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_total-surface-filter_input-{'min' if key == 'total_surface_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["rooms_min", "rooms_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_rooms-filter_input-{'min' if key == 'rooms_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["bedrooms_min", "bedrooms_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_bedrooms-filter_input-{'min' if key == 'bedrooms_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["bathrooms_min", "bathrooms_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_bathrooms-filter_input-{'min' if key == 'bathrooms_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                     elif key in ["construction_year_min", "construction_year_max"]:
                         field = self.page.locator(
                             f"[data-test-id='search-components_advanced-filters_construction-year-filter_input-{'min' if key == 'construction_year_min' else 'max'}']"
                         )
                         await field.fill(str(value))
-                        await self.page.wait_for_timeout(200)
 
                 except Exception as e:
                     logger.warning(f"Error al aplicar filtro {key}: {str(e)}")
                     continue
 
         # Simular comportamiento humano antes de hacer clic en "Done"
-        await self.page.wait_for_timeout(1000)
+        await pause(self.page, self.pacing.think_time)
 
         # Click "Done" button to apply filters
-        done_button = self.page.locator(
-            "[data-test-id='search-components_advanced-filters_submit-button']"
-        )
+        done_button = self.page.locator(FILTERS_SUBMIT_SELECTOR)
         await done_button.hover()
-        await self.page.wait_for_timeout(200)
-        await done_button.click()
+        await pause(self.page, self.pacing.action_delay)
+
+        # Lo capturado hasta aquí es la búsqueda sin filtrar
+        if self.capture is not None:
+            self.capture.reset()
+
+        # Los filtros están aplicados cuando llega la nueva respuesta de la
+        # API y el listado termina de re-renderizarse
+        await click_and_wait_for_search_api(
+            self.page,
+            done_button,
+            timeout=budget_ms(self.deadline, SEARCH_RESPONSE_TIMEOUT),
+        )
+        await wait_for_dom_settled(self.page, self.pacing.settle_quiet)
 
-        # Esperar a que los filtros se apliquen
-        await self.page.wait_for_timeout(2000)
-        await self.page.wait_for_load_state("networkidle")
+    async def _choose_option(self, value: str):
+        """Escribe en el dropdown abierto y confirma la opción filtrada"""
+        await self.page.keyboard.type(value, delay=self.pacing.typing_delay)
+        # Esperar a que la lista de opciones termine de filtrarse
+        await wait_for_dom_settled(self.page, self.pacing.settle_quiet)
+        await self.page.keyboard.press("Enter")
 
 
 #########################################################################
@@ -260,7 +388,1049 @@ class FilterManager:
 #########################################################################
 
 
-async def run_scraper(
+# Selectores de las cards de resultados
+RESULTS_CONTAINER_SELECTOR = ".sc-e5f1eba3-3.cGSWBa"
+CARD_PRICE_SELECTOR = "[data-test-id$='search-components_result-card_price']"
+CARD_LOCATION_SELECTOR = "[data-test-id$='_location']"
+CARD_HEADLINE_SELECTOR = "[data-test-id$='_headline']"
+CARD_BEDROOMS_SELECTOR = "[data-test-id$='-bedrooms']"
+CARD_BATHROOMS_SELECTOR = "[data-test-id$='-bathrooms']"
+CARD_LINK_SELECTOR = "div[class='sc-d1d212c8-15 jCbBbQ'] > a"
+
+# Extrae todas las cards del contenedor en una sola evaluación dentro de la página.
+# Las cards sin precio visible se devuelven como null para conservar el índice.
+EXTRACT_CARDS_JS = """
+(container, selectors) => {
+    const isVisible = (el) =>
+        !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const visibleText = (card, selector) => {
+        const el = card.querySelector(selector);
+        return isVisible(el) ? el.innerText : null;
+    };
+    return Array.from(container.querySelectorAll("article")).map((card) => {
+        const price = card.querySelector(selectors.price);
+        if (!isVisible(price)) {
+            return null;
+        }
+        const links = card.querySelectorAll(selectors.link);
+        const link = links.length ? links[links.length - 1] : null;
+        return {
+            price: price.innerText,
+            location: visibleText(card, selectors.location),
+            headline: visibleText(card, selectors.headline),
+            bedrooms: visibleText(card, selectors.bedrooms),
+            bathrooms: visibleText(card, selectors.bathrooms),
+            url: link ? link.getAttribute("href") : null,
+        };
+    });
+}
+"""
+
+EXTRACTION_MODES = ("api", "batch", "dom")
+
+# Estrategias alternativas para los elementos que más cambian entre despliegues
+selector_registry.register(
+    "filters_button",
+    "hashed_class",
+    lambda page: page.locator(".sc-abdb55db-0.fBcWGp.sc-d6722799-14.gCmxhq"),
+)
+selector_registry.register(
+    "filters_button",
+    "span_text",
+    lambda page: page.locator("button span:has-text('Filtros')").first,
+)
+selector_registry.register(
+    "filters_button",
+    "data_test_id",
+    lambda page: page.locator(
+        "[data-test-id='search-components_filter-bar_advanced-filters-button']"
+    ),
+)
+selector_registry.register(
+    "search_input",
+    "hashed_class",
+    lambda page: page.locator(".sc-7856fc0a-2.foWFcA"),
+)
+selector_registry.register(
+    "search_input",
+    "search_form_input",
+    lambda page: page.locator(
+        "form input[type='text'], form input[type='search']"
+    ).first,
+)
+selector_registry.register(
+    "search_input",
+    "combobox_role",
+    lambda page: page.get_by_role("combobox").first,
+)
+selector_registry.register(
+    "search_button",
+    "hashed_class",
+    lambda page: page.locator(".sc-a6c22956-0.fMdhBy.sc-7856fc0a-4.kUdQjI"),
+)
+selector_registry.register(
+    "search_button",
+    "button_role",
+    lambda page: page.get_by_role("button", name="Buscar").first,
+)
+selector_registry.register(
+    "search_button",
+    "submit_button",
+    lambda page: page.locator("form button[type='submit']").first,
+)
+selector_registry.register(
+    "results_container",
+    "hashed_class",
+    lambda page: page.locator(RESULTS_CONTAINER_SELECTOR),
+)
+selector_registry.register(
+    "results_container",
+    "result_list_test_id",
+    lambda page: page.locator("[data-test-id*='result-list']").first,
+)
+selector_registry.register(
+    "results_container",
+    "first_card_parent",
+    lambda page: page.locator("article").first.locator("xpath=.."),
+)
+
+
+def clean_property(property_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Elimina campos vacíos y espacios sobrantes"""
+    return {
+        k: v.strip() if isinstance(v, str) else v for k, v in property_data.items() if v
+    }
+
+
+def is_valid_property(property_data: Dict[str, Any]) -> bool:
+    """Validar datos mínimos (precio y al menos ubicación o título)"""
+    return bool(
+        property_data.get("price")
+        and (property_data.get("location") or property_data.get("headline"))
+    )
+
+
+async def extract_cards_batch(property_container) -> List[Dict[str, Any]]:
+    """
+    Extrae todas las cards con una única evaluación en la página, de modo que
+    el costo por página no crece con el número de cards x round-trips.
+    """
+    results = []
+    raw_cards = await property_container.evaluate(
+        EXTRACT_CARDS_JS,
+        {
+            "price": CARD_PRICE_SELECTOR,
+            "location": CARD_LOCATION_SELECTOR,
+            "headline": CARD_HEADLINE_SELECTOR,
+            "bedrooms": CARD_BEDROOMS_SELECTOR,
+            "bathrooms": CARD_BATHROOMS_SELECTOR,
+            "link": CARD_LINK_SELECTOR,
+        },
+    )
+
+    CARDS.labels(outcome="seen").inc(len(raw_cards))
+    for i, property_data in enumerate(raw_cards):
+        if property_data is None:
+            logger.info(f"Propiedad {i+1} no tiene precio visible, saltando...")
+            CARDS.labels(outcome="rejected").inc()
+            continue
+
+        property_data = clean_property(property_data)
+        if is_valid_property(property_data):
+            results.append(property_data)
+            CARDS.labels(outcome="accepted").inc()
+        else:
+            logger.info(f"Propiedad {i+1} no cumple con los datos mínimos requeridos")
+            CARDS.labels(outcome="rejected").inc()
+
+    logger.info(f"{len(results)} de {len(raw_cards)} propiedades procesadas")
+    return results
+
+
+async def extract_cards_dom(page, property_cards, count: int) -> List[Dict[str, Any]]:
+    """Extrae las cards una por una con llamadas individuales a Playwright"""
+    results = []
+    CARDS.labels(outcome="seen").inc(count)
+    for i in range(count):
+        try:
+            card = property_cards.nth(i)
+
+            # Verificar si es una propiedad que nos interesa
+            price_element = card.locator(CARD_PRICE_SELECTOR)
+            if not await price_element.is_visible():
+                logger.info(f"Propiedad {i+1} no tiene precio visible, saltando...")
+                CARDS.labels(outcome="rejected").inc()
+                continue
+
+            # Extraer datos básicos
+            property_data = {}
+
+            # Extraer precio
+            property_data["price"] = await price_element.inner_text()
+
+            # Extraer ubicación si existe
+            location_element = card.locator(CARD_LOCATION_SELECTOR)
+            if await location_element.is_visible():
+                property_data["location"] = await location_element.inner_text()
+
+            # Extraer título si existe
+            headline_element = card.locator(CARD_HEADLINE_SELECTOR)
+            if await headline_element.is_visible():
+                property_data["headline"] = await headline_element.inner_text()
+
+            # Solo agregar estos campos si existen
+            bedrooms_element = card.locator(CARD_BEDROOMS_SELECTOR)
+            if await bedrooms_element.is_visible():
+                property_data["bedrooms"] = await bedrooms_element.inner_text()
+
+            bathrooms_element = card.locator(CARD_BATHROOMS_SELECTOR)
+            if await bathrooms_element.is_visible():
+                property_data["bathrooms"] = await bathrooms_element.inner_text()
+
+            # Intentar obtener la URL si existe
+            # link_element = (
+            #     card.locator(".sc-d1d212c8-15.jCbBbQ ")
+            #     .get_by_rol("link")
+            #     .all()
+            # )
+
+            # for _ in link_element:
+            #     print(_.get_attribute("href"))
+
+            link_element = card.locator("//div[@class='sc-d1d212c8-15 jCbBbQ']/a")
+
+            for link in await link_element.element_handles():
+                property_data["url"] = await link.get_attribute("href")
+                logger.info(f"URL encontrada: {property_data['url']}")
+
+            property_data = clean_property(property_data)
+
+            if is_valid_property(property_data):
+                results.append(property_data)
+                CARDS.labels(outcome="accepted").inc()
+                logger.info(f"Propiedad {i+1} procesada exitosamente")
+            else:
+                CARDS.labels(outcome="rejected").inc()
+                logger.info(
+                    f"Propiedad {i+1} no cumple con los datos mínimos requeridos"
+                )
+
+        except Exception as e:
+            logger.error(f"Error procesando propiedad {i+1}: {str(e)}")
+            CARDS.labels(outcome="rejected").inc()
+            continue
+
+    return results
+
+
+# Selectores de paginación y conteo de resultados
+RESULT_COUNT_SELECTOR = "[data-test-id$='result-count']"
+PAGINATION_SELECTOR = (
+    "[data-test-id*='pagination'] a, [data-test-id*='pagination'] button"
+)
+PAGE_QUERY_PARAM = "page"
+
+# Lee el total de resultados, el último número de página visible y
+# cuántas cards hay en la página actual
+PAGINATION_JS = """
+(selectors) => {
+    const countEl = document.querySelector(selectors.count);
+    const total = countEl ? parseInt(countEl.innerText.replace(/\\D/g, ""), 10) : NaN;
+    const pages = Array.from(document.querySelectorAll(selectors.pagination))
+        .map((el) => parseInt(el.innerText.trim(), 10))
+        .filter((n) => !Number.isNaN(n));
+    return {
+        total: Number.isNaN(total) ? null : total,
+        lastPage: pages.length ? Math.max(...pages) : null,
+        cardsPerPage: document.querySelectorAll(selectors.cards).length,
+    };
+}
+"""
+
+
+def validate_listings(listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aplica a anuncios leídos de JSON la misma limpieza y validación del DOM"""
+    results = []
+    CARDS.labels(outcome="seen").inc(len(listings))
+    for property_data in listings:
+        property_data = clean_property(property_data)
+        if is_valid_property(property_data):
+            results.append(property_data)
+            CARDS.labels(outcome="accepted").inc()
+        else:
+            CARDS.labels(outcome="rejected").inc()
+    return results
+
+
+async def wait_for_results(
+    page, capture: Optional[SearchApiCapture] = None, timeout: Optional[int] = None
+):
+    """
+    Espera lo primero que aparezca: el JSON de la API capturado o el
+    contenedor de resultados en el DOM, con un único timeout (ms) para ambos.
+    Si gana el DOM se da un margen corto a la API y, si no llega, la captura
+    queda marcada para que la extracción no la vuelva a esperar.
+    """
+    container = asyncio.ensure_future(
+        selector_registry.find(page, "results_container", timeout=timeout)
+    )
+    if capture is None:
+        await container
+        return
+    api_timeout = SEARCH_API_TIMEOUT if timeout is None else timeout / 1000
+    api = asyncio.ensure_future(capture.wait_for_listings(api_timeout))
+    try:
+        pending = {container, api}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            if api in done and api.result():
+                return
+            if container in done and container.exception() is None:
+                if not api.done():
+                    await asyncio.wait({api}, timeout=SEARCH_API_GRACE)
+                if not capture.listings:
+                    # Render en servidor: la API no va a llegar en esta página
+                    capture.timed_out = True
+                return
+        # Ninguno llegó: propagar el error del selector
+        container.result()
+    finally:
+        for task in (container, api):
+            task.cancel()
+        await asyncio.gather(container, api, return_exceptions=True)
+
+
+async def extract_api_listings(capture: SearchApiCapture) -> List[Dict[str, Any]]:
+    """Toma los anuncios capturados de la API aplicando la misma validación"""
+    return validate_listings(await capture.wait_for_listings())
+
+
+@timed("extract_cards")
+async def extract_page_cards(
+    page,
+    extraction_mode: str = "batch",
+    capture: Optional[SearchApiCapture] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Extrae las propiedades de la página. En modo "api" se usan los anuncios
+    capturados del JSON de búsqueda y el DOM queda como respaldo.
+    """
+    if extraction_mode == "api" and capture is not None:
+        # Una sola espera por página, compartida entre la API y el DOM
+        await wait_for_results(page, capture)
+        results = await extract_api_listings(capture)
+        if results:
+            logger.info(f"{len(results)} propiedades extraídas de la API")
+            return results
+        logger.info("Sin anuncios de la API, extrayendo desde el DOM")
+
+    logger.info("waiting for properties to load")
+
+    # Esperar al contenedor principal de propiedades
+    property_container = await selector_registry.find(page, "results_container")
+
+    # Usar un selector más específico para las cards
+    property_cards = property_container.locator("article")
+
+    # Verificar si encontramos artículos
+    count = await property_cards.count()
+    logger.info(f"Número de artículos encontrados: {count}")
+
+    if count == 0:
+        logger.warning("No se encontraron propiedades")
+        return []
+
+    if extraction_mode == "dom":
+        return await extract_cards_dom(page, property_cards, count)
+    return await extract_cards_batch(property_container)
+
+
+@timed("discover_pages")
+async def discover_page_count(page, capture: Optional[SearchApiCapture] = None) -> int:
+    """Calcula el número de páginas de resultados de la búsqueda actual"""
+    info = await page.evaluate(
+        PAGINATION_JS,
+        {
+            "count": RESULT_COUNT_SELECTOR,
+            "pagination": PAGINATION_SELECTOR,
+            "cards": "article",
+        },
+    )
+    page_count = info.get("lastPage") or 1
+    if info.get("total") and info.get("cardsPerPage"):
+        page_count = max(page_count, math.ceil(info["total"] / info["cardsPerPage"]))
+    if capture is not None and capture.total and capture.listings:
+        page_count = max(page_count, math.ceil(capture.total / len(capture.listings)))
+
+    logger.info(f"Resultados totales: {info.get('total')}, páginas: {page_count}")
+    return page_count
+
+
+def build_page_url(url: str, page_number: int) -> str:
+    """Devuelve la URL de resultados con el número de página indicado"""
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k != PAGE_QUERY_PARAM]
+    query.append((PAGE_QUERY_PARAM, str(page_number)))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+@timed("results_page")
+async def scrape_results_page(
+    context, url: str, extraction_mode: str = "batch"
+) -> List[Dict[str, Any]]:
+    """Abre una pestaña en el contexto compartido y extrae las cards de la URL"""
+    page = await context.new_page()
+    capture = None
+    if extraction_mode == "api":
+        capture = SearchApiCapture()
+        capture.attach(page)
+    try:
+        await page.goto(url, wait_until="domcontentloaded")
+        return await extract_page_cards(page, extraction_mode, capture)
+    finally:
+        await page.close()
+
+
+async def iter_remaining_pages(
+    context,
+    base_url: str,
+    page_count: int,
+    extraction_mode: str = "api",
+    page_concurrency: int = PAGE_CONCURRENCY,
+    ordered: bool = False,
+) -> AsyncIterator[Optional[List[Dict[str, Any]]]]:
+    """
+    Carga las páginas 2..page_count en pestañas paralelas del mismo contexto,
+    de modo que comparten los filtros aplicados. Entrega la lista de cards de
+    cada página en cuanto termina de cargarse, o en orden de página con
+    `ordered`. Una página que falla se entrega como None.
+    """
+    semaphore = asyncio.Semaphore(max(1, page_concurrency))
+
+    async def fetch(page_number: int) -> Optional[List[Dict[str, Any]]]:
+        async with semaphore:
+            url = build_page_url(base_url, page_number)
+            try:
+                cards = await scrape_results_page(context, url, extraction_mode)
+            except Exception as e:
+                logger.error(f"Error procesando la página {page_number}: {str(e)}")
+                return None
+            logger.info(f"Página {page_number}: {len(cards)} propiedades")
+            return cards
+
+    tasks = [asyncio.create_task(fetch(n)) for n in range(2, page_count + 1)]
+    try:
+        for next_page in tasks if ordered else asyncio.as_completed(tasks):
+            yield await next_page
+    finally:
+        # Si el consumidor se detiene antes, cancelar las páginas pendientes
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iter_tab_pages(
+    page,
+    page_count: int,
+    extraction_mode: str = "api",
+    capture: Optional[SearchApiCapture] = None,
+    pacing: PacingProfile = PACING_PROFILES[DEFAULT_PACING],
+    deadline: Optional[float] = None,
+) -> AsyncIterator[Optional[List[Dict[str, Any]]]]:
+    """
+    Recorre las páginas 2..page_count en la misma pestaña con los controles
+    de paginación, así se conservan los filtros aplicados por la interfaz
+    aunque la URL no los refleje. Si una página falla se entrega None y el
+    recorrido termina, porque la siguiente ya no es alcanzable.
+    """
+    for page_number in range(2, page_count + 1):
+        apply_budget(page, deadline, DEFAULT_TIMEOUT)
+        link = (
+            page.locator(PAGINATION_SELECTOR)
+            .filter(has_text=re.compile(rf"^\s*{page_number}\s*$"))
+            .first
+        )
+        try:
+            if capture is not None:
+                capture.reset()
+                await click_and_wait_for_search_api(
+                    page,
+                    link,
+                    timeout=budget_ms(deadline, SEARCH_RESPONSE_TIMEOUT),
+                )
+            else:
+                await link.click()
+                await wait_for_dom_settled(page, pacing.settle_quiet)
+            cards = await extract_page_cards(page, extraction_mode, capture)
+        except Exception as e:
+            logger.error(f"Error paginando a la página {page_number}: {str(e)}")
+            yield None
+            return
+        logger.info(f"Página {page_number}: {len(cards)} propiedades")
+        yield cards
+
+
+async def search_via_ui(
+    page,
+    location: str,
+    filters: Dict[str, Optional[str]],
+    pacing: PacingProfile = PACING_PROFILES[DEFAULT_PACING],
+    deadline: Optional[float] = None,
+    locations: Optional[LocationCache] = location_cache,
+    capture: Optional[SearchApiCapture] = None,
+    state_store: Optional[StorageStateStore] = storage_state_store,
+):
+    """
+    Flujo tipeado: carga la página inicial, escribe la ubicación, busca y
+    aplica los filtros con el FilterManager. Si la ubicación ya se resolvió
+    antes, se va directo a su URL de resultados y solo se aplican los filtros.
+    El consentimiento de cookies se guarda en `state_store` (None no guarda).
+    """
+    target = locations.get(location) if locations is not None else None
+    if capture is not None:
+        capture.reset()
+    if target is None or not await open_resolved_location(page, target, deadline):
+        if target is not None:
+            locations.invalidate(location)
+        if capture is not None:
+            capture.reset()
+        await search_location(page, location, pacing, deadline, state_store)
+        if (
+            locations is not None
+            and urlparse(page.url).path != urlparse(INITIAL_URL).path
+        ):
+            locations.set(location, build_search_url(location, {}, base=page.url))
+    else:
+        logger.info(f"Ubicación '{location}' abierta desde la caché")
+        await accept_cookie_banner(page, pacing, state_store)
+
+    # Crear una instancia del FilterManager; open_filters espera a que el
+    # botón de filtros de la página de resultados sea visible
+    filter_manager = FilterManager(page, pacing, deadline, capture)
+    logger.info("filter manager instanciated")
+
+    # Aplicar filtros personalizados
+    await filter_manager.apply_filters(**filters)
+    logger.info("filters applied")
+
+
+async def open_resolved_location(
+    page, target: str, deadline: Optional[float] = None
+) -> bool:
+    """Abre la URL de resultados cacheada; False si ya no muestra resultados"""
+    try:
+        with span("goto_cached_location"):
+            apply_budget(page, deadline, DEFAULT_TIMEOUT)
+            response = await page.goto(target, wait_until="domcontentloaded")
+            if response is not None and not response.ok:
+                return False
+            await selector_registry.find(
+                page,
+                "results_container",
+                timeout=budget_ms(deadline, SEARCH_URL_TIMEOUT),
+            )
+        return True
+    except Exception as e:
+        logger.warning(f"La ubicación cacheada no respondió: {str(e)}")
+        return False
+
+
+async def accept_cookie_banner(
+    page,
+    pacing: PacingProfile = PACING_PROFILES[DEFAULT_PACING],
+    state_store: Optional[StorageStateStore] = storage_state_store,
+    timeout: int = COOKIE_BANNER_TIMEOUT,
+):
+    """
+    Acepta el banner de cookies si aparece. El popup suele montarse un poco
+    después que el resto de la página, así que se espera hasta `timeout` ms;
+    con el consentimiento ya guardado (storage state) no aparece y solo se
+    comprueba una vez.
+    """
+    with span("cookie_banner"):
+        cookie_popup = page.locator("#didomi-popup")
+        try:
+            cookies = await page.context.cookies()
+            if any(cookie["name"] == CONSENT_COOKIE for cookie in cookies):
+                if not await cookie_popup.is_visible():
+                    return
+            else:
+                await cookie_popup.wait_for(state="visible", timeout=timeout)
+        except Exception:
+            logger.info("No apareció el banner de cookies")
+            return
+
+        try:
+            cookie_button = page.locator("#didomi-notice-agree-button")
+            await cookie_button.hover()
+            await pause(page, pacing.action_delay)
+            await cookie_button.click()
+            logger.info("Cookie banner aceptado")
+            await cookie_popup.wait_for(state="hidden")
+
+            # El estado guardado faltaba o fue rechazado: renovarlo
+            if state_store is not None:
+                await state_store.save(page.context)
+        except Exception as e:
+            logger.warning(f"No se pudo aceptar el banner de cookies: {str(e)}")
+
+
+async def search_location(
+    page,
+    location: str,
+    pacing: PacingProfile = PACING_PROFILES[DEFAULT_PACING],
+    deadline: Optional[float] = None,
+    state_store: Optional[StorageStateStore] = storage_state_store,
+):
+    """Escribe la ubicación en el buscador de la página inicial y busca"""
+    with span("goto_initial"):
+        apply_budget(page, deadline, DEFAULT_TIMEOUT)
+        await page.goto(INITIAL_URL, wait_until="domcontentloaded")
+
+        # La página está lista cuando el campo de búsqueda es visible
+        search_input = await selector_registry.find(
+            page, "search_input", timeout=budget_ms(deadline, SELECTOR_TIMEOUT)
+        )
+
+    logger.info(f"Entered {INITIAL_URL}")
+
+    await accept_cookie_banner(page, pacing, state_store)
+
+    with span("location_typing"):
+        apply_budget(page, deadline, DEFAULT_TIMEOUT)
+        await search_input.hover()
+        await pause(page, pacing.action_delay)
+        await search_input.press_sequentially(location, delay=pacing.typing_delay)
+
+        # Dejar que el autocompletado termine de reaccionar a lo escrito
+        await wait_for_dom_settled(page, pacing.settle_quiet)
+
+    logger.info("Campo de búsqueda completado")
+
+    with span("search_click"):
+        apply_budget(page, deadline, DEFAULT_TIMEOUT)
+        search_button = await selector_registry.find(
+            page, "search_button", timeout=budget_ms(deadline, SELECTOR_TIMEOUT)
+        )
+        await search_button.hover()
+        await pause(page, pacing.action_delay)
+
+        # Hacer clic y esperar a que la navegación se complete
+        async with page.expect_navigation(wait_until="domcontentloaded"):
+            await search_button.click()
+    logger.info("Botón de búsqueda clickeado")
+
+
+# Parámetros de una URL de resultados que no dependen de la ubicación
+RESULT_URL_FILTER_PARAMS = {
+    param for key, param in SEARCH_QUERY_PARAMS.items() if key != "location"
+} | {PAGE_QUERY_PARAM}
+
+
+def build_search_url(
+    location: str, filters: Dict[str, Optional[str]], base: Optional[str] = None
+) -> str:
+    """
+    Construye la URL final de resultados con la ubicación y todos los filtros.
+    Con `base` (una URL de resultados ya resuelta por el sitio) se conserva su
+    ubicación y se reemplazan los filtros y la página.
+    """
+    if base:
+        parsed = urlparse(base)
+        query = [
+            (k, v)
+            for k, v in parse_qsl(parsed.query)
+            if k not in RESULT_URL_FILTER_PARAMS
+        ]
+        prefix = urlunparse(parsed._replace(query=""))
+    else:
+        query = [(SEARCH_QUERY_PARAMS["location"], location.strip())]
+        prefix = SEARCH_URL
+    for key in FILTER_FIELDS:
+        value = filters.get(key)
+        if value is not None and str(value).strip():
+            query.append((SEARCH_QUERY_PARAMS[key], str(value).strip()))
+    return f"{prefix}?{urlencode(query)}"
+
+
+def resolve_search_url(
+    location: str,
+    filters: Dict[str, Optional[str]],
+    locations: Optional[LocationCache] = location_cache,
+) -> Tuple[str, bool]:
+    """URL de resultados, partiendo de la ubicación cacheada si la hay"""
+    target = locations.get(location) if locations is not None else None
+    return build_search_url(location, filters, base=target), target is not None
+
+
+# Rangos de filtro que se pueden comprobar en los anuncios devueltos
+FILTER_RANGE_CHECKS = {
+    "price": ("price", lambda text: parse_price(text)[1]),
+    "bedrooms": ("bedrooms", parse_count),
+    "bathrooms": ("bathrooms", parse_count),
+    "living_surface": ("living_surface", parse_surface),
+}
+
+
+def _same_filter_value(actual: Any, expected: str) -> bool:
+    if actual is None:
+        return False
+    actual_number = parse_number(actual, thousands_only=True)
+    expected_number = parse_number(expected, thousands_only=True)
+    if actual_number is not None and expected_number is not None:
+        return actual_number == expected_number
+    return str(actual).strip().casefold() == expected.casefold()
+
+
+def url_filters_applied(filters: Dict[str, Optional[str]], payloads: List[Any]) -> bool:
+    """
+    Comprueba que el sitio aplicó los filtros pasados por la URL: con el
+    estado de filtros que declaran los payloads o, si no lo traen, revisando
+    que los anuncios cumplan los rangos pedidos. Si no hay forma de
+    comprobarlo devuelve False y la búsqueda sigue por el flujo tipeado.
+    """
+    expected = {
+        SEARCH_QUERY_PARAMS[key]: str(value).strip()
+        for key, value in filters.items()
+        if value is not None and str(value).strip()
+    }
+    if not expected:
+        return True
+
+    state: Dict[str, Any] = {}
+    for payload in payloads:
+        for param, value in find_filter_state(payload, expected).items():
+            state.setdefault(param, value)
+    if state:
+        ignored = [
+            param
+            for param, value in expected.items()
+            if not _same_filter_value(state.get(param), value)
+        ]
+        if ignored:
+            logger.warning(f"Filtros de la URL no aplicados: {', '.join(ignored)}")
+        return not ignored
+
+    listings = [
+        parse_api_listing(item)
+        for payload in payloads
+        for item in find_listings(payload)
+    ]
+    checked = False
+    for prefix, (field, parse) in FILTER_RANGE_CHECKS.items():
+        low = parse_number(filters.get(f"{prefix}_min"), thousands_only=True)
+        high = parse_number(filters.get(f"{prefix}_max"), thousands_only=True)
+        if low is None and high is None:
+            continue
+        for property_data in listings:
+            value = parse(property_data.get(field))
+            if value is None:
+                continue
+            checked = True
+            if (low is not None and value < low) or (high is not None and value > high):
+                logger.warning(f"Anuncio fuera del filtro {prefix} de la URL")
+                return False
+    if not checked:
+        logger.info("No se pudo comprobar que la URL aplicara los filtros")
+    return checked
+
+
+@timed("navigation_url")
+async def search_via_url(
+    page,
+    location: str,
+    filters: Dict[str, Optional[str]],
+    capture: Optional[SearchApiCapture] = None,
+    deadline: Optional[float] = None,
+    locations: Optional[LocationCache] = location_cache,
+) -> bool:
+    """
+    Navega a la URL de resultados en un solo goto. Devuelve False si el sitio
+    rechaza la URL, no muestra resultados o no aplica los filtros, para usar
+    el flujo tipeado.
+    """
+    url, cached = resolve_search_url(location, filters, locations)
+    logger.info(f"Navegando a la URL de búsqueda: {url}")
+    if capture is not None:
+        capture.reset()
+    try:
+        apply_budget(page, deadline, DEFAULT_TIMEOUT)
+        response = await page.goto(url, wait_until="domcontentloaded")
+        if response is not None and not response.ok:
+            logger.warning(f"URL de búsqueda rechazada con estado {response.status}")
+            if cached:
+                locations.invalidate(location)
+            return False
+
+        # Lo primero que llegue entre el JSON de la API y el contenedor
+        await wait_for_results(
+            page, capture, timeout=budget_ms(deadline, SEARCH_URL_TIMEOUT)
+        )
+
+        # Los nombres de los parámetros no están garantizados por el sitio:
+        # sin filtros aplicados la búsqueda se repite por el flujo tipeado
+        if capture is not None and capture.payload is not None:
+            payloads = [capture.payload]
+        else:
+            payloads = extract_hydration_payloads(await page.content())
+        return url_filters_applied(filters, payloads)
+    except Exception as e:
+        logger.warning(f"No se pudo usar la URL de búsqueda: {str(e)}")
+        if cached:
+            locations.invalidate(location)
+        return False
+
+
+async def iter_unique_properties(
+    pages: AsyncIterator[Optional[List[Dict[str, Any]]]],
+    store: Optional[ListingStore],
+    search_key: str,
+    run_started: float,
+    delta: bool = False,
+    max_results: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Recorre las páginas sin repetir URLs. Una página que no se pudo cargar
+    llega como None.
+
+    En modo delta registra cada anuncio en el store y solo entrega novedades;
+    los anuncios sin URL no se pueden comparar y se descartan. Las páginas deben llegar en orden:
+    la primera página sin cambios detiene el recorrido, ya que las siguientes
+    se asumen conocidas. Los retirados solo se pueden detectar recorriendo
+    todo, así que cada DELTA_FULL_WALK_INTERVAL se hace un recorrido completo
+    que, si termina sin páginas fallidas, entrega los anuncios retirados. A
+    cambio, un retiro se informa con hasta ese intervalo de retraso y esa
+    corrida cuesta tanto como una no delta.
+    """
+    full_walk = delta and store.needs_full_walk(search_key)
+    if full_walk:
+        logger.info("Recorrido completo para detectar anuncios retirados")
+    seen_urls = set()
+    yielded = 0
+    complete = True
+    async with aclosing(pages) as pages:
+        async for cards in pages:
+            if cards is None:
+                complete = False
+                continue
+            page_compared = page_changes = 0
+            for property_data in cards:
+                url = property_data.get("url")
+                if url:
+                    if url in seen_urls:
+                        continue
+                    seen_urls.add(url)
+
+                if delta:
+                    if not url:
+                        continue
+                    status = store.record(search_key, property_data, run_started)
+                    page_compared += 1
+                    if status == "unchanged":
+                        continue
+                    page_changes += 1
+                    property_data = {**property_data, "change": status}
+
+                yield property_data
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    complete = False
+                    break
+
+            if max_results is not None and yielded >= max_results:
+                break
+            # Con las páginas en orden, una sin novedades indica que el resto
+            # ya se conoce
+            if delta and not full_walk and page_compared and not page_changes:
+                logger.info("Página sin cambios, deteniendo la paginación")
+                complete = False
+                break
+
+    logger.info(f"{yielded} propiedades únicas encontradas")
+
+    if full_walk and complete:
+        for property_data in store.mark_removed(search_key, run_started):
+            yield {**property_data, "change": "removed"}
+        store.record_full_walk(search_key, run_started)
+
+
+async def count_search_results_http(
+    location: str, filters: Dict[str, Optional[str]]
+) -> Optional[int]:
+    """Total de resultados leído sin navegador, o None si la ruta HTTP no sirve"""
+    url, _ = resolve_search_url(location, filters)
+    try:
+        _, total, payload = await fetch_search_page(url)
+    except FastPathUnavailable as e:
+        logger.info(f"Sin conteo por HTTP: {str(e)}")
+        return None
+    if not url_filters_applied(filters, [payload]):
+        return None
+    return total
+
+
+async def count_search_results(
+    context, location: str, filters: Dict[str, Optional[str]]
+) -> Optional[int]:
+    """Total de resultados de una búsqueda, o None si no se pudo leer"""
+    page = await context.new_page()
+    capture = SearchApiCapture()
+    capture.attach(page)
+    try:
+        if not await search_via_url(page, location, filters, capture):
+            return None
+        if capture.total:
+            return capture.total
+        info = await page.evaluate(
+            PAGINATION_JS,
+            {
+                "count": RESULT_COUNT_SELECTOR,
+                "pagination": PAGINATION_SELECTOR,
+                "cards": "article",
+            },
+        )
+        return info.get("total")
+    finally:
+        await page.close()
+
+
+async def iter_split_scraper(
+    location: str,
+    filters: Dict[str, Optional[str]],
+    max_results: Optional[int],
+    scraper_kwargs: Dict[str, Any],
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Divide la búsqueda por precio (y luego superficie o habitaciones) hasta
+    que cada parte quede bajo el límite del sitio, ejecuta las partes en
+    paralelo y entrega el resultado combinado sin URLs repetidas.
+    """
+    use_http = (
+        scraper_kwargs.get("fetch_mode") == "http"
+        and scraper_kwargs.get("navigation_mode") == "url"
+    )
+    async with AsyncExitStack() as stack:
+        # El navegador solo se abre si algún conteo no sale por HTTP
+        context = None
+        context_lock = asyncio.Lock()
+
+        async def browser_context():
+            nonlocal context
+            async with context_lock:
+                if context is None:
+                    context = await stack.enter_async_context(
+                        open_context(
+                            scraper_kwargs.get("pool"), scraper_kwargs.get("context")
+                        )
+                    )
+            return context
+
+        async def count(part):
+            if use_http:
+                total = await count_search_results_http(location, part)
+                if total is not None:
+                    return total
+            return await count_search_results(await browser_context(), location, part)
+
+        with span("plan_partitions"):
+            partitions = await plan_partitions(count, filters)
+
+    factories = [
+        functools.partial(iter_scraper, location, **part, **scraper_kwargs)
+        for part in partitions
+    ]
+    seen_urls = set()
+    yielded = 0
+    async with aclosing(iter_merged(factories)) as properties:
+        async for property_data in properties:
+            url = property_data.get("url")
+            if url:
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+            yield property_data
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                break
+
+
+@asynccontextmanager
+async def open_context(pool: Optional[BrowserPool] = None, context=None, **options):
+    """
+    Entrega un BrowserContext listo para usar. Si se recibe un contexto (o
+    un proveedor async de uno) se reutiliza tal cual, sin cerrarlo; si hay
+    un pool se toma prestado de él; si no, se lanza un navegador propio que
+    se cierra al terminar. Las `options` van a new_scraper_context.
+    """
+    if context is not None:
+        # Un proveedor (función async) entrega el contexto recién al pedirlo
+        if callable(context):
+            context = await context()
+        yield context
+        return
+
+    if pool is not None:
+        async with pool.context(**options) as context:
+            yield context
+        return
+
+    async with async_playwright() as playwright:
+        browser = await launch_browser(playwright)
+        try:
+            context = await new_scraper_context(browser, **options)
+            try:
+                yield context
+            finally:
+                await context.close()
+        finally:
+            await browser.close()
+
+
+@asynccontextmanager
+async def open_har_context(
+    pool: Optional[BrowserPool] = None,
+    context=None,
+    har_mode: str = "live",
+    har_path: Optional[str] = None,
+    har_latency: Optional[float] = None,
+):
+    """
+    Como open_context, pero en modo "record" el contexto graba todo su
+    tráfico en `har_path` (se escribe al cerrarlo) y en "replay" responde
+    cada petición desde esa grabación, sin red y con `har_latency` ms fijos.
+    """
+    if har_mode == "live":
+        async with open_context(pool, context) as context:
+            yield context
+        return
+
+    if har_mode == "record":
+        os.makedirs(os.path.dirname(har_path) or ".", exist_ok=True)
+        # Sin storage state ni caché de assets, para que todo pase por la red
+        # y quede en el HAR
+        async with open_context(
+            pool,
+            state_store=None,
+            cache_assets=False,
+            record_har_path=har_path,
+            record_har_content="embed",
+        ) as context:
+            yield context
+        logger.info(f"Tráfico grabado en {har_path}")
+        return
+
+    replayer = HarReplayer.load(
+        har_path, HAR_REPLAY_LATENCY if har_latency is None else har_latency
+    )
+    async with open_context(pool, state_store=None, intercept=False) as context:
+        await replayer.attach(context)
+        yield context
+    logger.info(f"Reproducción de {har_path}: {replayer.stats()}")
+
+
+async def iter_scraper(
     location: str,
     property_type: Optional[str] = None,
     property_subtype: Optional[str] = None,
@@ -280,264 +1450,318 @@ async def run_scraper(
     bathrooms_max: Optional[str] = None,
     construction_year_min: Optional[str] = None,
     construction_year_max: Optional[str] = None,
-) -> List[Dict[str, Any]]:
-    results = []
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    async with async_playwright() as playwright:
-        # Configuración optimizada del navegador con evasión de detección
-        browser = await playwright.chromium.launch(
-            headless=True,  # Mantener visible para debugging
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-blink-features=AutomationControlled",  # Ocultar webdriver
-                "--disable-infobars",
-                "--single-process",
-                "--window-size=800,600",
-                "--start-maximized",
-            ],
+    pool: Optional[BrowserPool] = None,
+    extraction_mode: str = "api",
+    page_concurrency: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    max_results: Optional[int] = None,
+    navigation_mode: str = "url",
+    enrich: bool = False,
+    detail_concurrency: Optional[int] = None,
+    store: Optional[ListingStore] = None,
+    delta: bool = False,
+    pacing: str = DEFAULT_PACING,
+    time_budget: Optional[float] = None,
+    split: bool = False,
+    fetch_mode: str = "http",
+    har_mode: str = "live",
+    har_name: Optional[str] = None,
+    har_latency: Optional[float] = None,
+    context=None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Versión generadora del scraper: entrega cada propiedad validada en cuanto
+    se extrae, sin esperar a que terminen las demás páginas.
+
+    Con un ListingStore se registra cada anuncio visto. En modo delta solo se
+    entregan los anuncios nuevos, cambiados o retirados (campo "change"): las
+    páginas se procesan en orden y la paginación se detiene en la primera sin
+    novedades, salvo en el recorrido completo periódico que detecta los
+    retirados (ver iter_unique_properties).
+
+    `pacing` elige el perfil de pausas deliberadas del flujo tipeado
+    (fast, default o stealth).
+
+    Con `time_budget` (segundos) cada paso usa solo el tiempo que queda y, al
+    agotarse, el trabajo en curso se cancela y se lanza DeadlineExceeded
+    después de entregar lo obtenido hasta ese momento.
+
+    Con `split` la búsqueda se divide en sub-búsquedas disjuntas que quedan
+    bajo el límite de resultados del sitio y se ejecutan en paralelo.
+
+    Con `fetch_mode="http"` (y navegación por URL) las páginas de resultados
+    se piden con un cliente HTTP compartido y los anuncios se leen de los
+    datos de hidratación; el navegador solo se abre si eso falla.
+
+    Con `har_mode="record"` se graba el tráfico del navegador y los
+    resultados bajo `har_name`; con `har_mode="replay"` la búsqueda se
+    reproduce desde esa grabación sin red, con `har_latency` ms por respuesta.
+    """
+    if extraction_mode not in EXTRACTION_MODES:
+        raise ValueError(f"Modo de extracción no soportado: {extraction_mode}")
+    if navigation_mode not in NAVIGATION_MODES:
+        raise ValueError(f"Modo de navegación no soportado: {navigation_mode}")
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"Modo de obtención no soportado: {fetch_mode}")
+    if har_mode not in HAR_MODES:
+        raise ValueError(f"Modo HAR no soportado: {har_mode}")
+    pacing_profile = get_pacing(pacing)
+
+    har_path = results_path = None
+    locations = location_cache
+    state_store = storage_state_store
+    if har_mode != "live":
+        if har_name is None:
+            raise ValueError("El modo HAR requiere har_name")
+        if split:
+            raise ValueError("El modo HAR no es compatible con split")
+        if context is not None:
+            raise ValueError("El modo HAR necesita un contexto propio")
+        har_path, results_path = har_paths(har_name)
+        # El cliente HTTP no pasa por el HAR, y la caché de ubicaciones haría
+        # que la reproducción navegue distinto a la grabación
+        fetch_mode = "browser"
+        locations = None
+        # Los contextos HAR arrancan sin storage state y la sesión grabada o
+        # reproducida no debe pisar la guardada
+        state_store = None
+
+    filters = {
+        "property_type": property_type,
+        "property_subtype": property_subtype,
+        "price_min": price_min,
+        "price_max": price_max,
+        "living_surface_min": living_surface_min,
+        "living_surface_max": living_surface_max,
+        "plot_surface_min": plot_surface_min,
+        "plot_surface_max": plot_surface_max,
+        "total_surface_min": total_surface_min,
+        "total_surface_max": total_surface_max,
+        "rooms_min": rooms_min,
+        "rooms_max": rooms_max,
+        "bedrooms_min": bedrooms_min,
+        "bedrooms_max": bedrooms_max,
+        "bathrooms_min": bathrooms_min,
+        "bathrooms_max": bathrooms_max,
+        "construction_year_min": construction_year_min,
+        "construction_year_max": construction_year_max,
+    }
+
+    if delta and store is None:
+        raise ValueError("El modo delta requiere un ListingStore")
+
+    deadline = deadline_after(time_budget)
+
+    if split:
+        # Los conjuntos de sub-búsquedas cambian entre corridas, así que no
+        # sirven para detectar anuncios retirados
+        if delta:
+            raise ValueError("El modo delta no es compatible con split")
+        sub_kwargs = dict(
+            pool=pool,
+            extraction_mode=extraction_mode,
+            page_concurrency=page_concurrency,
+            max_pages=max_pages,
+            max_results=max_results,
+            navigation_mode=navigation_mode,
+            enrich=enrich,
+            detail_concurrency=detail_concurrency,
+            store=store,
+            pacing=pacing,
+            fetch_mode=fetch_mode,
+            context=context,
         )
-
-        # Configuración del contexto con evasión de detección
-        context = await browser.new_context(
-            viewport={"width": 800, "height": 600},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            java_script_enabled=True,
-            ignore_https_errors=True,
-            bypass_csp=True,
-            permissions=["geolocation"],
-            geolocation={
-                "latitude": 4.6097,
-                "longitude": -74.0817,
-            },  # Coordenadas de Bogotá
-            locale="es-CO",
+        properties = iter_until(
+            iter_split_scraper(location, filters, max_results, sub_kwargs), deadline
         )
+        async with aclosing(properties) as properties:
+            async for property_data in properties:
+                yield property_data
+        return
 
-        # Configurar timeouts más largos para simular comportamiento humano
-        context.set_default_timeout(60000)
-        context.set_default_navigation_timeout(60000)
-
-        page = await context.new_page()
+    search_key = cache_key({"location": location, **filters})
+    run_started = time.time()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # Bloquear recursos innecesarios para ahorrar memoria
-        await page.route(
-            "**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,otf,eot}",
-            lambda route: route.abort(),
-        )
-        await page.route(
-            "**/{analytics,tracking,advertisement,ads}.js", lambda route: route.abort()
+    if fetch_mode == "http" and navigation_mode == "url":
+        url, cached = resolve_search_url(location, filters, locations)
+        try:
+            with span("http_search"):
+                first_listings, total, payload = await fetch_search_page(
+                    url, timeout=remaining(deadline)
+                )
+                if not url_filters_applied(filters, [payload]):
+                    raise FastPathUnavailable("El sitio ignoró los filtros de la URL")
+                # Cero resultados solo es una respuesta confiable con una
+                # ubicación ya resuelta y filtros que expliquen el vacío; si
+                # no, el autocompletado del navegador decide
+                if not first_listings and not (cached and any(filters.values())):
+                    if cached:
+                        locations.invalidate(location)
+                    raise FastPathUnavailable("Búsqueda HTTP sin resultados")
+        except FastPathUnavailable as e:
+            # Sin tiempo para el navegador: no tiene sentido abrirlo
+            if deadline is not None and remaining(deadline) <= 0:
+                raise DeadlineExceeded()
+            FETCH_PATH.labels(path="fallback").inc()
+            logger.info(f"Sin ruta HTTP, usando el navegador: {str(e)}")
+        else:
+            FETCH_PATH.labels(path="http").inc()
+
+            async def iter_http_pages():
+                first_page = validate_listings(first_listings)
+                yield first_page
+                if not first_listings or (
+                    max_results is not None and len(first_page) >= max_results
+                ):
+                    return
+
+                page_count = math.ceil((total or 0) / len(first_listings)) or 1
+                if max_pages is not None:
+                    page_count = min(page_count, max_pages)
+                urls = [build_page_url(url, n) for n in range(2, page_count + 1)]
+                async with aclosing(
+                    iter_search_pages(urls, ordered=delta)
+                ) as remaining_pages:
+                    async for listings in remaining_pages:
+                        yield None if listings is None else validate_listings(listings)
+
+            properties = iter_unique_properties(
+                iter_http_pages(), store, search_key, run_started, delta, max_results
+            )
+            async with AsyncExitStack() as stack:
+                # El navegador solo hace falta para las páginas de detalle
+                if enrich:
+                    detail_context = await within(
+                        stack.enter_async_context(open_context(pool, context)),
+                        deadline,
+                    )
+                    properties = iter_enriched(
+                        detail_context, properties, INITIAL_URL, detail_concurrency
+                    )
+                properties = iter_until(properties, deadline)
+                async with aclosing(properties) as properties:
+                    async for property_data in properties:
+                        yield property_data
+            return
+
+    FETCH_PATH.labels(path="browser").inc()
+    async with AsyncExitStack() as stack:
+        # La espera por un contexto (incluido el cupo del pool) y la pestaña
+        # también consumen el presupuesto
+        context = await within(
+            stack.enter_async_context(
+                open_har_context(pool, context, har_mode, har_path, har_latency)
+            ),
+            deadline,
         )
+        page = await within(context.new_page(), deadline)
 
-        # Inyectar scripts para evadir detección
-        await page.add_init_script(
-            """
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5]
-            });
-            window.chrome = {
-                runtime: {}
-            };
-        """
-        )
+        # Escuchar la API de búsqueda antes de cualquier navegación
+        capture = None
+        if extraction_mode == "api":
+            capture = SearchApiCapture()
+            capture.attach(page)
 
         try:
             logger.info("Starting scraper")
-            await page.goto(INITIAL_URL, wait_until="domcontentloaded")
 
-            await page.wait_for_timeout(1000)
+            async def iter_pages():
+                # La navegación queda dentro del generador para que cuente en
+                # el presupuesto de tiempo
+                # Solo con los filtros confirmados en la URL se pueden abrir
+                # las demás páginas en pestañas nuevas
+                url_confirmed = navigation_mode == "url" and await search_via_url(
+                    page, location, filters, capture, deadline, locations
+                )
+                if url_confirmed:
+                    logger.info("Búsqueda cargada directamente por URL")
+                else:
+                    await search_via_ui(
+                        page,
+                        location,
+                        filters,
+                        pacing_profile,
+                        deadline,
+                        locations,
+                        capture,
+                        state_store,
+                    )
 
-            logger.info(f"Entered {INITIAL_URL}")
+                apply_budget(page, deadline, DEFAULT_TIMEOUT)
+                first_page = await extract_page_cards(page, extraction_mode, capture)
+                yield first_page
+                if not first_page:
+                    # Sin filtros, una búsqueda vacía indica que la ubicación
+                    # cacheada ya no sirve
+                    if locations is not None and not any(filters.values()):
+                        locations.invalidate(location)
+                    return
+
+                # Sesión exitosa: guardar cookies y localStorage si están viejos
+                if state_store is not None:
+                    await state_store.refresh(context)
+
+                # Descubrir el número de páginas y traer el resto
+                page_count = await discover_page_count(page, capture)
+                if max_pages is not None:
+                    page_count = min(page_count, max_pages)
+
+                if page_count > 1 and (
+                    max_results is None or len(first_page) < max_results
+                ):
+                    if url_confirmed or not any(filters.values()):
+                        pages = iter_remaining_pages(
+                            context,
+                            page.url,
+                            page_count,
+                            extraction_mode=extraction_mode,
+                            page_concurrency=page_concurrency or PAGE_CONCURRENCY,
+                            ordered=delta,
+                        )
+                    else:
+                        # Filtros aplicados por la interfaz: la URL de la
+                        # página podría no reproducirlos en otra pestaña
+                        pages = iter_tab_pages(
+                            page,
+                            page_count,
+                            extraction_mode,
+                            capture,
+                            pacing_profile,
+                            deadline,
+                        )
+                    async with aclosing(pages) as remaining:
+                        async for cards in remaining:
+                            yield cards
 
-            # Manejar cookies con retraso aleatorio
-            try:
-                cookie_popup = page.locator("#didomi-popup")
-                if await cookie_popup.is_visible():
-                    await page.wait_for_timeout(1000)
-                    cookie_button = page.locator("#didomi-notice-agree-button")
-                    await cookie_button.hover()
-                    await page.wait_for_timeout(200)
-                    await cookie_button.click()
-                    logger.info("Cookie banner aceptado")
-                    await cookie_popup.wait_for(state="hidden")
-            except Exception as e:
-                logger.info(f"No se encontró el banner de cookies: {str(e)}")
-
-            # Buscar y llenar el campo de búsqueda con retrasos
-            search_input = page.locator(".sc-7856fc0a-2.foWFcA")
-            await search_input.wait_for(state="visible")
-            await search_input.hover()
-            await page.wait_for_timeout(200)
-
-            # Escribir la ubicación letra por letra
-            for char in location:
-                await search_input.type(char, delay=50)
-                await page.wait_for_timeout(50)
-
-            logger.info("Campo de búsqueda completado")
-
-            # Simular comportamiento humano antes de hacer clic
-            search_button = page.locator(".sc-a6c22956-0.fMdhBy.sc-7856fc0a-4.kUdQjI")
-            await search_button.wait_for(state="visible")
-            await search_button.hover()
-            await page.wait_for_timeout(200)
-
-            # Hacer clic y esperar a que la navegación se complete
-            async with page.expect_navigation(wait_until="domcontentloaded"):
-                await search_button.click()
-            logger.info("Botón de búsqueda clickeado")
-
-            # Esperar a que la página se estabilice con tiempo aleatorio
-            await page.wait_for_timeout(2000)
-            await page.wait_for_load_state("networkidle")
-
-            # Crear una instancia del FilterManager
-            filter_manager = FilterManager(page)
-            logger.info("filter manager instanciated")
-
-            # Esperar antes de aplicar filtros
-            await page.wait_for_timeout(2000)
-
-            # Aplicar filtros personalizados
-            await filter_manager.apply_filters(
-                property_type=property_type,
-                property_subtype=property_subtype,
-                price_min=price_min,
-                price_max=price_max,
-                living_surface_min=living_surface_min,
-                living_surface_max=living_surface_max,
-                plot_surface_min=plot_surface_min,
-                plot_surface_max=plot_surface_max,
-                total_surface_min=total_surface_min,
-                total_surface_max=total_surface_max,
-                rooms_min=rooms_min,
-                rooms_max=rooms_max,
-                bedrooms_min=bedrooms_min,
-                bedrooms_max=bedrooms_max,
-                bathrooms_min=bathrooms_min,
-                bathrooms_max=bathrooms_max,
-                construction_year_min=construction_year_min,
-                construction_year_max=construction_year_max,
+            properties = iter_unique_properties(
+                iter_pages(), store, search_key, run_started, delta, max_results
             )
-            logger.info("filters applied")
-
-            # Esperar a que la página cargue completamente
-            await page.wait_for_load_state("networkidle")
+            if enrich:
+                properties = iter_enriched(
+                    context, properties, INITIAL_URL, detail_concurrency
+                )
+            properties = iter_until(properties, deadline)
 
-            # Obtener numero de propiedades encontradas
-            logger.info("waiting for properties to load")
             try:
-                # Esperar al contenedor principal de propiedades
-                property_container = page.locator(".sc-e5f1eba3-3.cGSWBa")
-                await property_container.wait_for(state="visible")
-
-                # Usar un selector más específico para las cards
-                property_cards = property_container.locator("article")
-
-                # Verificar si encontramos artículos
-                count = await property_cards.count()
-                logger.info(f"Número de artículos encontrados: {count}")
-
-                if count == 0:
-                    logger.warning("No se encontraron propiedades")
-                    return results
-
-                # Procesar las propiedades
-                for i in range(count):
-                    try:
-                        card = property_cards.nth(i)
-
-                        # Verificar si es una propiedad que nos interesa
-                        price_element = card.locator(
-                            "[data-test-id$='search-components_result-card_price']"
-                        )
-                        if not await price_element.is_visible():
-                            logger.info(
-                                f"Propiedad {i+1} no tiene precio visible, saltando..."
-                            )
-                            continue
-
-                        # Extraer datos básicos
-                        property_data = {}
-
-                        # Extraer precio
-                        property_data["price"] = await price_element.inner_text()
-
-                        # Extraer ubicación si existe
-                        location_element = card.locator("[data-test-id$='_location']")
-                        if await location_element.is_visible():
-                            property_data["location"] = (
-                                await location_element.inner_text()
-                            )
-
-                        # Extraer título si existe
-                        headline_element = card.locator("[data-test-id$='_headline']")
-                        if await headline_element.is_visible():
-                            property_data["headline"] = (
-                                await headline_element.inner_text()
-                            )
-
-                        # Solo agregar estos campos si existen
-                        bedrooms_element = card.locator("[data-test-id$='-bedrooms']")
-                        if await bedrooms_element.is_visible():
-                            property_data["bedrooms"] = (
-                                await bedrooms_element.inner_text()
-                            )
-
-                        bathrooms_element = card.locator("[data-test-id$='-bathrooms']")
-                        if await bathrooms_element.is_visible():
-                            property_data["bathrooms"] = (
-                                await bathrooms_element.inner_text()
-                            )
-
-                        # Intentar obtener la URL si existe
-                        # link_element = (
-                        #     card.locator(".sc-d1d212c8-15.jCbBbQ ")
-                        #     .get_by_rol("link")
-                        #     .all()
-                        # )
-
-                        # for _ in link_element:
-                        #     print(_.get_attribute("href"))
-
-                        link_element = card.locator(
-                            "//div[@class='sc-d1d212c8-15 jCbBbQ']/a"
-                        )
-
-                        for link in await link_element.element_handles():
-                            property_data["url"] = await link.get_attribute("href")
-                            logger.info(f"URL encontrada: {property_data['url']}")
-
-                        # Limpiar datos
-                        property_data = {
-                            k: v.strip() if isinstance(v, str) else v
-                            for k, v in property_data.items()
-                            if v
-                        }
-
-                        # Validar datos mínimos (precio y al menos ubicación o título)
-                        if property_data.get("price") and (
-                            property_data.get("location")
-                            or property_data.get("headline")
-                        ):
+                results = []
+                async with aclosing(properties) as properties:
+                    async for property_data in properties:
+                        if har_mode != "live":
                             results.append(property_data)
-                            logger.info(f"Propiedad {i+1} procesada exitosamente")
-                        else:
-                            logger.info(
-                                f"Propiedad {i+1} no cumple con los datos mínimos requeridos"
-                            )
-
-                    except Exception as e:
-                        logger.error(f"Error procesando propiedad {i+1}: {str(e)}")
-                        continue
+                        yield property_data
 
-                    # Pequeña pausa entre propiedades
-                    if i % 5 == 0:
-                        await page.wait_for_timeout(200)
+                if har_mode == "record":
+                    save_results(
+                        results_path, {"location": location, **filters}, results
+                    )
+                elif har_mode == "replay":
+                    recorded = load_results(results_path)
+                    if recorded is not None:
+                        logger.info(
+                            f"Reproducción: {len(results)} propiedades "
+                            f"(grabadas: {len(recorded)})"
+                        )
 
             except Exception as e:
                 logger.error(f"Error al procesar propiedades: {str(e)}")
@@ -547,29 +1771,78 @@ async def run_scraper(
             logger.error(f"Error durante el scraping: {str(e)}")
             raise
         finally:
-            await context.close()
-            await browser.close()
+            # El contexto puede ser compartido, así que se cierra solo la página
+            await page.close()
+
+            interceptor = interceptor_for(context)
+            if interceptor is not None:
+                logger.info(f"Tráfico de red del contexto: {interceptor.stats()}")
+
+
+async def run_scraper(location: str, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Ejecuta el scraper y devuelve la lista completa de propiedades. Acepta los
+    mismos parámetros que iter_scraper. Si se agota `time_budget` lanza
+    DeadlineExceeded con las propiedades parciales en `partial`.
+    """
+    with span("scrape", location=location):
+        return await collect(iter_scraper(location, **kwargs))
 
-    return results
+
+async def run_scraper_records(location: str, **kwargs) -> List[ListingRecord]:
+    """
+    Como run_scraper, pero devuelve los anuncios como ListingRecord: precio,
+    habitaciones, baños y superficies se parsean una sola vez, en lote.
+    """
+    results = await run_scraper(location, **kwargs)
+    with span("parse_records"):
+        return parse_listings(results)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    from listing_export import EXPORT_FORMATS, FILE_EXTENSIONS, iter_export
+
+    parser = argparse.ArgumentParser(description="Ejecuta una búsqueda de ejemplo")
+    parser.add_argument("--location", default="Bogota, Colombia")
+    parser.add_argument("--har-mode", choices=HAR_MODES, default="live")
+    parser.add_argument("--har-name", default=None)
+    parser.add_argument(
+        "--har-latency", type=float, default=None, help="ms por respuesta en replay"
+    )
+    parser.add_argument("--format", choices=["json", *EXPORT_FORMATS], default="json")
+    parser.add_argument("--output", default=None, help="archivo para --format")
+    args = parser.parse_args()
+
     # Ejemplo de uso directo del scraper
     async def main():
-        results = await run_scraper(
-            location="Bogota, Colombia",
+        results = await run_scraper_records(
+            location=args.location,
             property_type="Apartamento",
             living_surface_min="1000",
             living_surface_max="10000",
             price_min="500000000",
             price_max="13000000000",
             rooms_min="3",
+            har_mode=args.har_mode,
+            har_name=args.har_name,
+            har_latency=args.har_latency,
         )
 
+        if args.format != "json":
+            output = args.output or f"listings.{FILE_EXTENSIONS[args.format]}"
+            with open(output, "wb") as f:
+                for chunk in iter_export(results, args.format):
+                    f.write(chunk)
+            print(f"{len(results)} propiedades escritas en {output}")
+            return
+
         for prop in results:
             print("\nPropiedad encontrada:")
-            for key, value in prop.items():
-                print(f"{key}: {value}")
+            for key, value in prop.to_dict().items():
+                if value is not None:
+                    print(f"{key}: {value}")
 
     # Ejecutar la función asíncrona
     asyncio.run(main())
@@ -0,0 +1,142 @@
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from metrics import SELECTOR_WINS, span
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Tiempo máximo de la carrera entre estrategias y del intento con la ganadora
+SELECTOR_TIMEOUT = int(os.getenv("SELECTOR_TIMEOUT", "10000"))
+SELECTOR_FAST_TIMEOUT = int(os.getenv("SELECTOR_FAST_TIMEOUT", "2000"))
+# Espera (ms) a las estrategias prioritarias cuando ya resolvió otra
+SELECTOR_PRIORITY_GRACE = int(os.getenv("SELECTOR_PRIORITY_GRACE", "100"))
+
+
+class SelectorNotFoundError(Exception):
+    """Ninguna estrategia encontró el elemento a tiempo"""
+
+
+@dataclass
+class SelectorStrategy:
+    name: str
+    build: Callable[[Any], Any]
+
+
+class SelectorRegistry:
+    """
+    Registro de estrategias de localización por elemento. Las estrategias se
+    prueban en paralelo y se recuerda, por proceso, cuál ganó la última vez
+    para darle ventaja.
+    """
+
+    def __init__(self):
+        self._strategies: Dict[str, List[SelectorStrategy]] = {}
+        self._winners: Dict[str, str] = {}
+
+    def register(self, target: str, name: str, build: Callable[[Any], Any]):
+        """
+        Agrega una estrategia: `build(page)` debe devolver un Locator. El
+        orden de registro es la prioridad cuando varias resuelven a la vez.
+        """
+        self._strategies.setdefault(target, []).append(SelectorStrategy(name, build))
+
+    def winners(self) -> Dict[str, str]:
+        return dict(self._winners)
+
+    async def _wait(self, page, strategy: SelectorStrategy, state: str, timeout: int):
+        locator = strategy.build(page)
+        await locator.wait_for(state=state, timeout=timeout)
+        return locator
+
+    def _won(self, target: str, strategy: SelectorStrategy, task: asyncio.Task):
+        self._winners[target] = strategy.name
+        SELECTOR_WINS.labels(target=target, strategy=strategy.name).inc()
+        logger.info(f"{target} encontrado con {strategy.name}")
+        return task.result()
+
+    async def find(
+        self,
+        page,
+        target: str,
+        state: str = "visible",
+        timeout: Optional[int] = None,
+    ):
+        """
+        Devuelve el Locator de la estrategia que alcanza `state`. Si varias lo
+        alcanzan en el mismo render gana la registrada primero.
+        """
+        strategies = self._strategies.get(target)
+        if not strategies:
+            raise KeyError(f"Sin estrategias registradas para {target}")
+        timeout = SELECTOR_TIMEOUT if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        with span("selector", target=target):
+            # Tarea -> prioridad (orden de registro) de su estrategia
+            tasks: Dict[asyncio.Task, int] = {}
+            try:
+                # La estrategia que ganó la última vez sale con ventaja, pero
+                # sigue en la carrera con todo el presupuesto si tarda
+                winner = self._winners.get(target)
+                if winner is not None:
+                    index = next(
+                        i for i, s in enumerate(strategies) if s.name == winner
+                    )
+                    task = asyncio.create_task(
+                        self._wait(page, strategies[index], state, timeout)
+                    )
+                    tasks[task] = index
+                    await asyncio.wait(
+                        {task}, timeout=min(timeout, SELECTOR_FAST_TIMEOUT) / 1000
+                    )
+                    if task.done() and task.exception() is None:
+                        return self._won(target, strategies[index], task)
+                    logger.info(f"La estrategia {winner} de {target} no respondió")
+
+                # Playwright toma 0 como "sin timeout"
+                budget = max(1, timeout - int((loop.time() - started) * 1000))
+                for index, strategy in enumerate(strategies):
+                    if strategy.name != winner:
+                        task = asyncio.create_task(
+                            self._wait(page, strategy, state, budget)
+                        )
+                        tasks[task] = index
+
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    resolved = [t for t in done if t.exception() is None]
+                    if not resolved:
+                        continue
+                    best = min(resolved, key=tasks.get)
+                    # Las de mayor prioridad que siguen esperando tienen un
+                    # momento para resolver sobre el mismo render
+                    higher = {t for t in pending if tasks[t] < tasks[best]}
+                    if higher:
+                        done, _ = await asyncio.wait(
+                            higher, timeout=SELECTOR_PRIORITY_GRACE / 1000
+                        )
+                        resolved += [t for t in done if t.exception() is None]
+                        best = min(resolved, key=tasks.get)
+                    return self._won(target, strategies[tasks[best]], best)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            raise SelectorNotFoundError(
+                f"No se encontró {target} con ninguna estrategia"
+            )
+
+
+selector_registry = SelectorRegistry()
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DATA_DIR = os.getenv("DATA_DIR", ".")
+# Archivo con cookies y localStorage de la última sesión buena; vacío lo desactiva
+STORAGE_STATE_PATH = (
+    os.getenv("STORAGE_STATE_PATH", os.path.join(DATA_DIR, "storage_state.json"))
+    or None
+)
+# Edad máxima del estado guardado antes de descartarlo por completo
+STORAGE_STATE_TTL = float(os.getenv("STORAGE_STATE_TTL", str(7 * 24 * 3600)))
+# Cada cuánto se vuelve a guardar tras una sesión exitosa
+STORAGE_STATE_REFRESH = float(os.getenv("STORAGE_STATE_REFRESH", "3600"))
+
+
+class StorageStateStore:
+    """
+    Persiste el storage state de Playwright (cookies y localStorage, incluido
+    el consentimiento de cookies) para que los contextos nuevos arranquen
+    con la sesión de una corrida anterior, incluso tras reiniciar el servicio.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = STORAGE_STATE_PATH,
+        ttl: float = STORAGE_STATE_TTL,
+        refresh_interval: float = STORAGE_STATE_REFRESH,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._state: Optional[Dict[str, Any]] = None
+        self._saved_at = 0.0
+        if path:
+            self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._state = json.load(f)
+            self._saved_at = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Storage state ilegible en {self.path}: {str(e)}")
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Estado para `browser.new_context(storage_state=...)`, sin las cookies
+        vencidas. Devuelve None si no hay estado o si ya expiró.
+        """
+        if self._state is None:
+            return None
+        if time.time() - self._saved_at > self.ttl:
+            logger.info("Storage state expirado, se descarta")
+            self.invalidate()
+            return None
+
+        now = time.time()
+        cookies = [
+            cookie
+            for cookie in self._state.get("cookies", [])
+            if cookie.get("expires", -1) <= 0 or cookie["expires"] > now
+        ]
+        return {**self._state, "cookies": cookies}
+
+    def is_stale(self) -> bool:
+        return (
+            self._state is None or time.time() - self._saved_at > self.refresh_interval
+        )
+
+    async def save(self, context):
+        """Guarda el storage state actual del contexto"""
+        state = await context.storage_state()
+        self._state = state
+        self._saved_at = time.time()
+        if not self.path:
+            return
+
+        # Escritura atómica: varios contextos pueden guardar a la vez
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+            logger.info(f"Storage state guardado en {self.path}")
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el storage state: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    async def refresh(self, context):
+        """Guarda el estado tras una sesión exitosa si el guardado es viejo"""
+        if self.is_stale():
+            await self.save(context)
+
+    def invalidate(self):
+        self._state = None
+        self._saved_at = 0.0
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"No se pudo borrar el storage state: {str(e)}")
+
+
+storage_state_store = StorageStateStore()
@@ -0,0 +1,323 @@
+import os
+import uuid
+import hashlib
+import asyncio
+import logging
+import multiprocessing
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from deadline import DeadlineExceeded, collect
+from metrics import mark_process_dead
+from result_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def _worker_count(value: str) -> int:
+    if value.strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return int(value)
+
+
+# Procesos worker con navegadores propios; 0 ejecuta todo en el proceso de
+# la API y "auto" usa uno por núcleo
+WORKER_PROCESSES = _worker_count(os.getenv("WORKER_PROCESSES", "0"))
+# Scrapes que atiende un worker antes de reciclarlo (0 = sin límite)
+WORKER_MAX_TASKS = int(os.getenv("WORKER_MAX_TASKS", "100"))
+# Scrapes en curso por worker a partir de los cuales se abandona el ruteo fijo
+WORKER_MAX_BACKLOG = int(os.getenv("WORKER_MAX_BACKLOG", "8"))
+WORKER_MONITOR_INTERVAL = float(os.getenv("WORKER_MONITOR_INTERVAL", "1"))
+# Cada cuánto reporta cada worker el estado de sus navegadores
+WORKER_STATS_INTERVAL = float(os.getenv("WORKER_STATS_INTERVAL", "5"))
+
+# Parámetros que identifican la búsqueda para el ruteo fijo
+ROUTING_EXCLUDE = {
+    "extraction_mode",
+    "page_concurrency",
+    "max_pages",
+    "max_results",
+    "navigation_mode",
+    "enrich",
+    "detail_concurrency",
+    "delta",
+    "pacing",
+    "time_budget",
+    "split",
+    "fetch_mode",
+    "har_mode",
+    "har_latency",
+}
+
+
+class WorkerTaskError(Exception):
+    """El scrape falló dentro del proceso worker"""
+
+
+async def _run_worker(inbox, outbox):
+    from browser_pool import BrowserPool
+    from http_fetcher import close_client
+    from listing_store import ListingStore
+    from scraper import iter_scraper
+
+    pool = BrowserPool()
+    store = ListingStore()
+    await pool.start()
+    loop = asyncio.get_running_loop()
+    running: Dict[str, asyncio.Task] = {}
+
+    async def run(task_id: str, params: Dict[str, Any]):
+        try:
+            async with aclosing(
+                iter_scraper(**params, pool=pool, store=store)
+            ) as properties:
+                async for property_data in properties:
+                    outbox.put(("item", task_id, property_data))
+            outbox.put(("done", task_id, None))
+        except asyncio.CancelledError:
+            outbox.put(("done", task_id, None))
+        except DeadlineExceeded:
+            outbox.put(("deadline", task_id, None))
+        except Exception as e:
+            outbox.put(("error", task_id, str(e)))
+        finally:
+            running.pop(task_id, None)
+
+    async def report_stats():
+        while True:
+            outbox.put(("browsers", os.getpid(), pool.stats()))
+            await asyncio.sleep(WORKER_STATS_INTERVAL)
+
+    reporter = asyncio.create_task(report_stats())
+    try:
+        while True:
+            message = await loop.run_in_executor(None, inbox.get)
+            if message is None:
+                break
+            kind, task_id, params = message
+            if kind == "run":
+                running[task_id] = asyncio.create_task(run(task_id, params))
+            elif kind == "cancel" and task_id in running:
+                running[task_id].cancel()
+
+        # Reciclaje: terminar lo que está en curso antes de salir
+        await asyncio.gather(*running.values(), return_exceptions=True)
+    finally:
+        reporter.cancel()
+        await pool.close()
+        await close_client()
+        store.close()
+
+
+def _worker_main(inbox, outbox):
+    asyncio.run(_run_worker(inbox, outbox))
+
+
+class _Worker:
+    def __init__(self, process, inbox):
+        self.process = process
+        self.inbox = inbox
+        self.assigned = 0
+        self.tasks: Set[str] = set()
+
+
+class WorkerSupervisor:
+    """
+    Reparte los scrapes entre N procesos worker, cada uno con su propio
+    BrowserPool. Las búsquedas iguales van siempre al mismo worker para
+    aprovechar sus cachés y su sesión, salvo que esté saturado. Los workers se
+    reciclan tras `max_tasks` scrapes y se reemplazan si mueren.
+    """
+
+    def __init__(
+        self,
+        workers: int = WORKER_PROCESSES,
+        max_tasks: int = WORKER_MAX_TASKS,
+        max_backlog: int = WORKER_MAX_BACKLOG,
+    ):
+        self.workers = max(1, workers)
+        self.max_tasks = max_tasks
+        self.max_backlog = max(1, max_backlog)
+        self._mp = multiprocessing.get_context("spawn")
+        self._outbox = None
+        self._slots: List[_Worker] = []
+        self._retiring: List[_Worker] = []
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._monitor: Optional[asyncio.Task] = None
+        # Último estado de los navegadores reportado por cada worker (por pid)
+        self._browser_stats: Dict[int, List[Dict[str, Any]]] = {}
+
+    @property
+    def started(self) -> bool:
+        return self._outbox is not None
+
+    def _spawn(self) -> _Worker:
+        inbox = self._mp.Queue()
+        process = self._mp.Process(
+            target=_worker_main, args=(inbox, self._outbox), daemon=True
+        )
+        process.start()
+        return _Worker(process, inbox)
+
+    async def start(self):
+        if self.started:
+            return
+        self._outbox = self._mp.Queue()
+        self._slots = [self._spawn() for _ in range(self.workers)]
+        self._reader = asyncio.create_task(self._read_loop())
+        self._monitor = asyncio.create_task(self._monitor_loop())
+        logger.info(f"Supervisor iniciado con {self.workers} procesos worker")
+
+    async def close(self):
+        if not self.started:
+            return
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+
+        workers = [*self._slots, *self._retiring]
+        for worker in workers:
+            worker.inbox.put(None)
+        loop = asyncio.get_running_loop()
+        for worker in workers:
+            await loop.run_in_executor(None, worker.process.join, 30)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            self._forget(worker)
+
+        # El lector está bloqueado en outbox.get: desbloquearlo para que salga
+        self._outbox.put(None)
+        await asyncio.gather(self._reader, return_exceptions=True)
+        self._slots, self._retiring = [], []
+        self._outbox = None
+        logger.info("Supervisor cerrado")
+
+    def _route(self, params: Dict[str, Any]) -> int:
+        """Índice del worker: fijo por búsqueda, o el menos cargado si está lleno"""
+        key = cache_key({k: v for k, v in params.items() if k not in ROUTING_EXCLUDE})
+        index = int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:8], 16) % len(
+            self._slots
+        )
+        if len(self._slots[index].tasks) < self.max_backlog:
+            return index
+        return min(range(len(self._slots)), key=lambda i: len(self._slots[i].tasks))
+
+    def _retire(self, index: int):
+        # El worker termina lo que tiene en curso y sale; uno nuevo toma su lugar
+        worker = self._slots[index]
+        worker.inbox.put(None)
+        self._retiring.append(worker)
+        self._slots[index] = self._spawn()
+        logger.info(f"Reciclando el worker {index} tras {worker.assigned} scrapes")
+
+    def _owner(self, task_id: str) -> Optional[_Worker]:
+        for worker in [*self._slots, *self._retiring]:
+            if task_id in worker.tasks:
+                return worker
+        return None
+
+    async def _read_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.run_in_executor(None, self._outbox.get)
+            if message is None:
+                break
+            kind, task_id, payload = message
+            if kind == "browsers":
+                self._browser_stats[task_id] = payload
+                continue
+            if kind != "item":
+                worker = self._owner(task_id)
+                if worker is not None:
+                    worker.tasks.discard(task_id)
+            queue = self._queues.get(task_id)
+            if queue is not None:
+                queue.put_nowait((kind, payload))
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(WORKER_MONITOR_INTERVAL)
+            for worker in list(self._retiring):
+                if not worker.process.is_alive():
+                    self._retiring.remove(worker)
+                    self._fail_tasks(worker, "El worker terminó sin completar")
+                    self._forget(worker)
+            for index, worker in enumerate(self._slots):
+                if not worker.process.is_alive():
+                    logger.warning(
+                        f"Worker {index} caído (código {worker.process.exitcode}), "
+                        "reemplazándolo"
+                    )
+                    self._fail_tasks(worker, "El worker se cayó durante el scrape")
+                    self._forget(worker)
+                    self._slots[index] = self._spawn()
+
+    def _forget(self, worker: _Worker):
+        """Olvida las métricas de un worker que ya terminó"""
+        self._browser_stats.pop(worker.process.pid, None)
+        mark_process_dead(worker.process.pid)
+
+    def _fail_tasks(self, worker: _Worker, error: str):
+        for task_id in worker.tasks:
+            queue = self._queues.get(task_id)
+            if queue is not None:
+                queue.put_nowait(("error", error))
+        worker.tasks.clear()
+
+    async def iter_results(
+        self, params: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Ejecuta iter_scraper en un worker y entrega las propiedades a medida que llegan"""
+        if not self.started:
+            raise RuntimeError("Supervisor no iniciado")
+
+        task_id = uuid.uuid4().hex
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[task_id] = queue
+        index = self._route(params)
+        worker = self._slots[index]
+        worker.tasks.add(task_id)
+        worker.assigned += 1
+        worker.inbox.put(("run", task_id, params))
+        if self.max_tasks > 0 and worker.assigned >= self.max_tasks:
+            self._retire(index)
+
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "item":
+                    yield payload
+                elif kind == "error":
+                    raise WorkerTaskError(payload)
+                elif kind == "deadline":
+                    raise DeadlineExceeded()
+                else:
+                    return
+        finally:
+            self._queues.pop(task_id, None)
+            # Si el consumidor se detiene antes, cancelar el scrape en el worker
+            if task_id in worker.tasks:
+                worker.inbox.put(("cancel", task_id, None))
+
+    async def run(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await collect(self.iter_results(params))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": [
+                {
+                    "pid": worker.process.pid,
+                    "alive": worker.process.is_alive(),
+                    "assigned": worker.assigned,
+                    "in_flight": len(worker.tasks),
+                    "browsers": self._browser_stats.get(worker.process.pid, []),
+                }
+                for worker in self._slots
+            ],
+            "retiring": len(self._retiring),
+        }